@@ -1,10 +1,16 @@
 import sys
 import os
-import uvicorn
-from fastapi import FastAPI, HTTPException
+import json
+import asyncio
+import hashlib
+import time
+from concurrent.futures import ThreadPoolExecutor
+from fastapi import FastAPI, HTTPException, Request, Response
+from fastapi.encoders import jsonable_encoder
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import Dict, List, Optional
 import pandas as pd
 import numpy as np
 import traceback
@@ -12,11 +18,24 @@ import traceback
 # Add parent directory to path to allow importing from src
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+from src import instrumentation
 from src.data_loader import DataLoader
-from src.feature_engineering import FeatureEngineer
-from src.models import ModelTrainer
+from src.feature_engineering import FeatureEngineer, MIN_FEATURE_BARS
+from src.dataset import SupervisedDatasetBuilder
+from src.models import ModelTrainer, XGBOOST_PARAMS
+from src.model_registry import ModelRegistry
+from src.tuning import load_best_params
 from src.risk_analysis import RiskAnalyzer
 from src.evaluation import evaluate_predictions
+from src.simulation import MonteCarloSimulator
+from src.response_cache import TTLCache
+from src.inference import InferenceService
+from src.downsample import lttb_indices
+
+try:
+    import orjson # Optional: several times faster than json for large chart payloads
+except ImportError:
+    orjson = None
 
 app = FastAPI(title="AntigravityStocks API", version="1.0.0")
 
@@ -29,6 +48,67 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Stage timers and cache counters for /metrics. On by default in the API; the
+# pipeline skips them entirely with STOCK_INSTRUMENTATION=0. PROFILE_DIR turns
+# on the sampling profiler (one folded-stack file per computed request).
+if os.environ.get('STOCK_INSTRUMENTATION', '1') == '1':
+    instrumentation.enable()
+
+@app.middleware("http")
+async def record_latency(request: Request, call_next):
+    if not instrumentation.enabled:
+        return await call_next(request)
+    start = time.perf_counter()
+    response = await call_next(request)
+    # Label with the route template, not the raw URL: every distinct URL (404
+    # scans, path parameters) would otherwise add a series that is never freed
+    route = request.scope.get('route')
+    path = getattr(route, 'path', None) or 'unmatched'
+    instrumentation.observe('stock_request_seconds', time.perf_counter() - start,
+                            method=request.method, path=path, status=str(response.status_code))
+    return response
+
+# Fitted models are cached on disk so repeated requests skip retraining
+registry = ModelRegistry(os.environ.get('MODEL_REGISTRY_DIR', 'models'),
+                         max_entries=int(os.environ.get('MODEL_REGISTRY_MAX_ENTRIES', 50)))
+
+# Best parameters found by tune.py, per ticker
+TUNING_DIR = os.environ.get('TUNING_DIR', 'tuning')
+
+# /predict forecasts the close this many trading days ahead, from the
+# features known at each day's close (tune.py's default horizon)
+PREDICT_HORIZON = int(os.environ.get('PREDICT_HORIZON', 1))
+
+# Bounded pool for the CPU-bound pipeline, so it never runs on the event loop.
+# NumPy, pandas and XGBoost release the GIL for most of their work.
+PIPELINE_WORKERS = int(os.environ.get('PIPELINE_WORKERS', os.cpu_count() or 4))
+executor = ThreadPoolExecutor(max_workers=PIPELINE_WORKERS)
+MAX_BATCH_SIZE = int(os.environ.get('MAX_BATCH_SIZE', 500))
+MAX_SIMULATION_PATHS = int(os.environ.get('MAX_SIMULATION_PATHS', 5_000_000))
+# Chunk threads per /simulate call. Each call already holds a pipeline worker,
+# so by default concurrent simulations share the cores instead of each using all
+SIMULATION_WORKERS = int(os.environ.get('SIMULATION_WORKERS', max(1, (os.cpu_count() or 1) // PIPELINE_WORKERS)))
+
+# Recent /predict responses keyed on the normalized request and the price-store
+# version, plus the computations currently in flight (single-flight) with the
+# number of requests awaiting each
+response_cache = TTLCache(max_entries=int(os.environ.get('RESPONSE_CACHE_SIZE', 256)),
+                          ttl=float(os.environ.get('RESPONSE_CACHE_TTL', 300)), name='response')
+inflight = {}
+
+# Micro-batched scoring of recent bars against registered models (/score)
+inference = InferenceService(registry,
+                             max_batch_size=int(os.environ.get('SCORE_MAX_BATCH', 256)),
+                             max_wait_ms=float(os.environ.get('SCORE_MAX_WAIT_MS', 2.0)))
+
+# chart_data layouts accepted by /predict: the list of points (default), a
+# columnar JSON object, or an Arrow IPC stream
+CHART_FORMATS = {
+    'points': 'application/json',
+    'columnar': 'application/json',
+    'arrow': 'application/vnd.apache.arrow.stream',
+}
+
 class StockRequest(BaseModel):
     ticker: str
     start_date: str
@@ -55,8 +135,51 @@ class PredictionResponse(BaseModel):
     current_price: float
     predicted_high: float
 
-@app.post("/predict", response_model=PredictionResponse)
-async def predict(request: StockRequest):
+class ChartColumns(BaseModel):
+    dates: List[str]
+    actual: List[Optional[float]]
+    predicted: List[Optional[float]]
+
+class CompactPredictionResponse(BaseModel):
+    ticker: str
+    model: str
+    metrics: Metrics
+    chart: ChartColumns
+    chart_points_total: int
+    current_price: float
+    predicted_high: float
+
+class TickerBars(BaseModel):
+    dates: Optional[List[str]] = None
+    columns: Dict[str, List[float]] # e.g. Close, High, Low, Open, Volume; oldest first
+
+class ScoreRequest(BaseModel):
+    bars: Dict[str, TickerBars]
+    model: str = 'XGBoost'
+
+class SimulationRequest(BaseModel):
+    ticker: str
+    start_date: str
+    end_date: str
+    method: str = 'gbm'
+    n_paths: int = 100_000
+    horizon: int = 252
+    initial_investment: float = 10_000.0
+
+class SimulationResponse(BaseModel):
+    ticker: str
+    method: str
+    n_paths: int
+    horizon: int
+    initial_investment: float
+    percentiles: Dict[str, List[float]]
+    expected_value: float
+    probability_of_loss: float
+    VaR_95: float
+    CVaR_95: float
+
+def run_prediction(request):
+    """Runs the full pipeline for one ticker (blocking; call through the executor)."""
     try:
         print(f"Received request: {request}")
         
@@ -69,16 +192,39 @@ async def predict(request: StockRequest):
 
         # 2. Feature Engineering
         fe = FeatureEngineer(df)
-        df_features = fe.prepare_data()
+        features = fe.prepare_matrix()
 
         # 3. Model Training (Fastest Model for API - XGBoost)
-        # Note: In a real app, successful models are saved/loaded. 
-        # Here we train on the fly as per original script design.
-        trainer = ModelTrainer(df_features, target_col='Close')
-        X_train, X_test, y_train, y_test = trainer.split_data()
-        
+        # Reuse a registered model when ticker, range, features and params match;
+        # train on the fly only on a registry miss.
+        trainer = ModelTrainer(features, target_col='Close')
         model_name = 'XGBoost'
-        trainer.train_xgboost()
+        # Tuned parameters for the ticker when tune.py has produced some
+        params = {**XGBOOST_PARAMS, **(load_best_params(request.ticker, model_name, TUNING_DIR) or {})}
+        feature_columns = features.columns
+        model_key = registry.make_key(request.ticker, request.start_date, request.end_date,
+                                      feature_columns, model_name, params,
+                                      feature_dtype=features.values.dtype, horizon=PREDICT_HORIZON)
+        builder = SupervisedDatasetBuilder(features, 'Close', horizons=(PREDICT_HORIZON,))
+        cached = registry.load(model_key)
+        if cached is not None:
+            print(f"Using registered model {model_key}")
+            trainer.load_dataset(builder.build(scaler=cached['scalers']['feature_scaler']))
+            trainer.models[model_name] = cached['model']
+        else:
+            trainer.load_dataset(builder.build())
+            trainer.train_xgboost(params)
+            registry.save(model_key, trainer.models[model_name], trainer.scalers, meta={
+                'ticker': request.ticker.upper(),
+                'start_date': request.start_date,
+                'end_date': request.end_date,
+                'model': model_name,
+                'params': params,
+                'feature_columns': feature_columns,
+                'feature_dtype': str(features.values.dtype),
+                'target_col': trainer.target_col,
+                'horizon': PREDICT_HORIZON,
+            })
         
         # 4. Predictions & Evaluation
         preds = trainer.predict(model_name)
@@ -89,26 +235,9 @@ async def predict(request: StockRequest):
         preds = preds[:min_len]
         actuals = actuals[:min_len]
         
-        # Get dates for the test set
-        # The test set is the last 20% by default in ModelTrainer (check implementation)
-        # We need to map these back to dates. 
-        # Assuming simple time-series split implies last N records.
-        # Prepare dates
-        if not pd.api.types.is_datetime64_any_dtype(df_features.index):
-             # Try to convert if it's not already datetime
-             try:
-                 # In case it's a RangeIndex or integer index that implies steps, we might not have real dates if they were dropped.
-                 # However, FeatureEngineer usually sets the Date as index.
-                 # If it failed, let's just use string representation or dummy dates.
-                 df_features.index = pd.to_datetime(df_features.index)
-             except:
-                 pass
-        
-        if pd.api.types.is_datetime64_any_dtype(df_features.index):
-             test_dates = df_features.index[-len(actuals):].strftime('%Y-%m-%d').tolist()
-        else:
-             # Fallback for non-datetime index
-             test_dates = [str(x) for x in df_features.index[-len(actuals):].tolist()]
+        # Dates of the actual closes: the last len(actuals) feature rows, each
+        # PREDICT_HORIZON rows after the row its forecast was made from
+        test_dates = np.datetime_as_string(np.asarray(features.dates[-len(actuals):], dtype='datetime64[D]'))
 
         # Metrics
         eval_metrics = evaluate_predictions(actuals, preds)
@@ -118,15 +247,13 @@ async def predict(request: StockRequest):
         risk_metrics = risk_analyzer.get_risk_metrics()
         decision_score = risk_analyzer.risk_aware_decision_score(0, risk_metrics)
         
-        # Construct Chart Data
-        chart_data = []
-        for i in range(len(test_dates)):
-            chart_data.append({
-                "date": test_dates[i],
-                "actual": float(actuals[i]),
-                "predicted": float(preds[i])
-            })
-            
+        # Chart data stays columnar; it is laid out per response format in render_prediction
+        chart = {
+            "dates": test_dates,
+            "actual": np.asarray(actuals, dtype=np.float64),
+            "predicted": np.asarray(preds, dtype=np.float64)
+        }
+
         # Determine Volatility Label
         vol = risk_metrics.get('Annualized Volatility', 0)
         vol_label = "Low" if vol < 0.15 else "Medium" if vol < 0.3 else "High"
@@ -134,22 +261,291 @@ async def predict(request: StockRequest):
         return {
             "ticker": request.ticker,
             "model": model_name,
-            "metrics": {
-                "RMSE": eval_metrics.get('RMSE', 0.0),
-                "MAPE": eval_metrics.get('MAPE', 0.0),
-                "VaR_95": risk_metrics.get('VaR (95%)', 0.0),
-                "Sharpe_Ratio": risk_metrics.get('Sharpe Ratio', 0.0),
-                "Decision_Score": decision_score,
-                "Volatility": vol_label
-            },
-            "chart_data": chart_data,
+            "metrics": jsonable_encoder(Metrics(
+                RMSE=eval_metrics.get('RMSE', 0.0),
+                MAPE=eval_metrics.get('MAPE', 0.0),
+                VaR_95=risk_metrics.get('VaR (95%)', 0.0),
+                Sharpe_Ratio=risk_metrics.get('Sharpe Ratio', 0.0),
+                Decision_Score=decision_score,
+                Volatility=vol_label
+            )),
+            "chart": chart,
             "current_price": float(actuals[-1]) if len(actuals) > 0 else 0.0,
             "predicted_high": float(max(preds)) if len(preds) > 0 else 0.0
         }
 
+    except HTTPException:
+        raise
+    except Exception as e:
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=str(e))
+
+def normalize_request(request):
+    """Canonical form of a request so equivalent payloads share one cache entry."""
+    try:
+        start = pd.Timestamp(request.start_date).strftime('%Y-%m-%d')
+        end = pd.Timestamp(request.end_date).strftime('%Y-%m-%d')
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid date: {e}")
+    return StockRequest(ticker=request.ticker.strip().upper(), start_date=start, end_date=end)
+
+def cache_key(request):
+    version = DataLoader(request.ticker, request.start_date, request.end_date).store.version(request.ticker)
+    # Re-tuning changes the model, so it invalidates cached responses too
+    params = json.dumps(load_best_params(request.ticker, 'XGBoost', TUNING_DIR), sort_keys=True)
+    return (request.ticker, request.start_date, request.end_date, version, params)
+
+def profiled(name, func, *args):
+    """Calls func(*args), sampled into a flamegraph profile when PROFILE_DIR is set."""
+    with instrumentation.profile(name):
+        return func(*args)
+
+def compute_and_cache(request):
+    """Runs the pipeline and caches the result under the post-run data version."""
+    result = profiled(f"predict-{request.ticker}", run_prediction, request)
+    # Loading may have fetched missing bars, so key on the version after the run
+    key = cache_key(request)
+    response_cache.set(key, result)
+    return result, key
+
+def release(key, entry):
+    """Forgets an in-flight computation, unless a newer one already took its key."""
+    if inflight.get(key) is entry:
+        del inflight[key]
+
+async def cached_prediction(request):
+    """
+    Returns (result, cache key) from the response cache, or computes it once
+    on the worker pool. Concurrent identical requests await the same computation.
+    """
+    request = normalize_request(request)
+    key = cache_key(request)
+    cached = response_cache.get(key)
+    if cached is not None:
+        return cached, key
+    entry = inflight.get(key)
+    if entry is None:
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(executor, compute_and_cache, request)
+        entry = inflight[key] = {'future': future, 'waiters': 0}
+        future.add_done_callback(lambda _: release(key, entry))
+    future = entry['future']
+    entry['waiters'] += 1
+    try:
+        # Shield so one client going away does not cancel the computation the others await
+        return await asyncio.shield(future)
+    finally:
+        entry['waiters'] -= 1
+        if not entry['waiters'] and not future.done():
+            # Last waiter gone: drop the work if it has not started on the pool yet
+            # (a running pipeline finishes and still fills the cache)
+            release(key, entry)
+            future.cancel()
+
+def dumps(obj):
+    """Serializes to JSON bytes, with orjson when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(obj, default=lambda o: o.tolist()).encode('utf-8')
+
+def points_payload(result, chart):
+    """The PredictionResponse layout: chart_data as a list of points."""
+    payload = {k: v for k, v in result.items() if k != 'chart'}
+    payload['chart_data'] = [{"date": d, "actual": a, "predicted": p} for d, a, p in
+                             zip(chart['dates'].tolist(), chart['actual'].tolist(), chart['predicted'].tolist())]
+    return payload
+
+def arrow_body(result, chart):
+    """Arrow IPC stream of the chart columns; the remaining fields travel as JSON schema metadata."""
+    import pyarrow as pa # Lazy import: only binary clients need it
+    summary = {k: v for k, v in result.items() if k != 'chart'}
+    summary['chart_points_total'] = len(result['chart']['dates'])
+    table = pa.table({
+        'date': pa.array(chart['dates'].astype('datetime64[D]')),
+        'actual': pa.array(chart['actual']),
+        'predicted': pa.array(chart['predicted']),
+    }).replace_schema_metadata({'summary': dumps(summary)})
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+@instrumentation.timed('api.render_prediction')
+def render_prediction(result, key, chart_format, max_points):
+    """
+    Returns (body, etag) for a prediction in the requested chart format,
+    downsampled to max_points with LTTB. Rendered bodies are cached next to
+    the result; the ETag hashes the body, so it differs per format and size.
+    """
+    render_key = (key, chart_format, max_points)
+    cached = response_cache.get(render_key)
+    if cached is not None:
+        return cached
+
+    chart = result['chart']
+    if max_points and len(chart['dates']) > max_points:
+        keep = lttb_indices(np.column_stack([chart['actual'], chart['predicted']]), max_points)
+        chart = {name: column[keep] for name, column in chart.items()}
+
+    if chart_format == 'arrow':
+        body = arrow_body(result, chart)
+    elif chart_format == 'columnar':
+        payload = {k: v for k, v in result.items() if k != 'chart'}
+        payload['chart'] = {**chart, 'dates': chart['dates'].tolist()}
+        payload['chart_points_total'] = len(result['chart']['dates'])
+        body = dumps(payload)
+    else:
+        body = dumps(points_payload(result, chart))
+    etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+    response_cache.set(render_key, (body, etag))
+    return body, etag
+
+@app.post("/predict", response_model=PredictionResponse,
+          responses={200: {"description": "PredictionResponse, or CompactPredictionResponse / an Arrow "
+                                          "stream depending on chart_format"}})
+async def predict(request: StockRequest, http_request: Request,
+                  chart_format: str = 'points', max_points: Optional[int] = None):
+    """
+    chart_format: 'points' (list of {date, actual, predicted}), 'columnar'
+    (CompactPredictionResponse, one array per column) or 'arrow' (Arrow IPC
+    stream). max_points downsamples the chart with LTTB, e.g. to the
+    client's pixel width.
+    """
+    if chart_format not in CHART_FORMATS:
+        raise HTTPException(status_code=400, detail=f"chart_format must be one of {list(CHART_FORMATS)}")
+    if max_points is not None and max_points < 3:
+        raise HTTPException(status_code=400, detail="max_points must be at least 3")
+    result, key = await cached_prediction(request)
+    loop = asyncio.get_running_loop()
+    body, etag = await loop.run_in_executor(executor, render_prediction, result, key, chart_format, max_points)
+    if_none_match = http_request.headers.get('if-none-match', '')
+    if etag in [tag.strip() for tag in if_none_match.split(',')]:
+        return Response(status_code=304, headers={'ETag': etag})
+    return Response(body, media_type=CHART_FORMATS[chart_format],
+                    headers={'ETag': etag, 'Cache-Control': 'no-cache'})
+
+def run_simulation(request):
+    """Projects wealth paths from the ticker's historical daily returns (blocking)."""
+    if not 0 < request.n_paths <= MAX_SIMULATION_PATHS or request.horizon <= 0:
+        raise HTTPException(status_code=400, detail=f"n_paths must be in 1..{MAX_SIMULATION_PATHS} and horizon positive")
+    try:
+        loader = DataLoader(request.ticker, request.start_date, request.end_date)
+        df = loader.load_data()
+        if df is None or df.empty:
+            raise HTTPException(status_code=404, detail="No data found for ticker")
+
+        returns = FeatureEngineer(df).compute_volatility()['Daily_Return'].dropna()
+        simulator = MonteCarloSimulator(returns, initial_value=request.initial_investment)
+        result = simulator.run(n_paths=request.n_paths, horizon=request.horizon, method=request.method,
+                               n_workers=SIMULATION_WORKERS)
+
+        return {
+            "ticker": request.ticker,
+            "method": result['method'],
+            "n_paths": result['n_paths'],
+            "horizon": result['horizon'],
+            "initial_investment": request.initial_investment,
+            "percentiles": {f"p{p}": band.tolist() for p, band in result['percentiles'].items()},
+            "expected_value": result['expected_terminal_value'],
+            "probability_of_loss": result['probability_of_loss'],
+            # VaR/CVaR as money at risk over the horizon
+            "VaR_95": result['VaR'] * request.initial_investment,
+            "CVaR_95": result['CVaR'] * request.initial_investment
+        }
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/simulate", response_model=SimulationResponse)
+async def simulate(request: SimulationRequest):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, profiled, f"simulate-{request.ticker}", run_simulation, request)
+
+@app.post("/score")
+async def score(request: ScoreRequest):
+    """
+    Scores the latest bar of each ticker with its most recent registered
+    model, without retraining. Only the trailing bars needed for the features
+    are used (about 300). Requests arriving together are micro-batched; each
+    result carries the latency metrics of the batch it was scored in.
+    """
+    if len(request.bars) > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=413, detail=f"Batch size exceeds {MAX_BATCH_SIZE} tickers")
+    futures = []
+    for ticker, bars in request.bars.items():
+        columns = {name: np.asarray(values, dtype=np.float64) for name, values in bars.columns.items()}
+        if 'Close' not in columns or len({len(v) for v in columns.values()}) != 1:
+            raise HTTPException(status_code=400, detail=f"Bars for {ticker} need a Close column and equal lengths")
+        if len(columns['Close']) < MIN_FEATURE_BARS:
+            raise HTTPException(status_code=400, detail=f"Bars for {ticker} need at least {MIN_FEATURE_BARS} rows, "
+                                                        f"got {len(columns['Close'])}")
+        if bars.dates is not None and len(bars.dates) != len(columns['Close']):
+            raise HTTPException(status_code=400, detail=f"Dates for {ticker} do not match the number of bars")
+        if bars.dates is not None:
+            columns['Date'] = np.asarray(bars.dates, dtype='datetime64[D]')
+        futures.append(asyncio.wrap_future(inference.submit(ticker, columns, request.model)))
+    results = await asyncio.gather(*futures)
+    return {"results": results}
+
+@app.get("/score/metrics")
+async def score_metrics():
+    """Latency summary of recent /score micro-batches."""
+    return inference.metrics()
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Stage latency histograms, request latencies and cache hit/miss counters in Prometheus format."""
+    return PlainTextResponse(instrumentation.render_prometheus(),
+                             media_type='text/plain; version=0.0.4; charset=utf-8')
+
+@app.post("/predict/batch")
+async def predict_batch(requests: List[StockRequest]):
+    """
+    Runs the pipeline for many tickers on the worker pool and streams each
+    result back as one NDJSON line as soon as it completes.
+    """
+    if len(requests) > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=413, detail=f"Batch size exceeds {MAX_BATCH_SIZE} requests")
+
+    async def run_one(request):
+        item = {"ticker": request.ticker, "start_date": request.start_date, "end_date": request.end_date}
+        try:
+            result, _ = await cached_prediction(request)
+            item.update(status="ok", result=points_payload(result, result['chart']))
+        except HTTPException as e:
+            item.update(status="error", status_code=e.status_code, detail=e.detail)
+        return item
+
+    async def stream():
+        # Fill the price store with bulk fetches first instead of one round trip per ticker
+        loop = asyncio.get_running_loop()
+        ranges = {}
+        for r in requests:
+            try:
+                r = normalize_request(r)
+            except HTTPException:
+                continue # Reported by run_one
+            ranges.setdefault((r.start_date, r.end_date), []).append(r.ticker)
+        # Failures here are not fatal: the per-ticker pipeline retries and reports them
+        await asyncio.gather(*[loop.run_in_executor(executor, DataLoader.prefetch, tickers, start, end)
+                               for (start, end), tickers in ranges.items()], return_exceptions=True)
+
+        tasks = [asyncio.ensure_future(run_one(r)) for r in requests]
+        try:
+            for task in asyncio.as_completed(tasks):
+                yield dumps(await task) + b"\n"
+        finally:
+            # Client went away: cancelling run_one releases its wait on the shared
+            # computation, which drops queued pipeline work no other request awaits
+            for task in tasks:
+                task.cancel()
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
 if __name__ == "__main__":
+    import uvicorn
     uvicorn.run("main:app", host="0.0.0.0", port=8081, reload=True)
@@ -0,0 +1,199 @@
+"""
+Per-stage timing and memory benchmarks for the forecasting pipeline.
+
+Runs entirely offline on synthetic prices. Each case runs in a fresh process
+so its peak RSS is not inflated by earlier cases.
+
+    python -m benchmarks.bench_pipeline --save benchmarks/baselines/local.json
+    python -m benchmarks.bench_pipeline --compare benchmarks/baselines/local.json --threshold 0.25
+
+With --compare the script exits with status 1 when any stage is slower than
+its baseline by more than the threshold.
+"""
+import argparse
+import contextlib
+import importlib
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from datetime import datetime
+from multiprocessing import get_context
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.data_sources import SyntheticSource, generate_prices
+from src.models import TRAIN_METHODS
+
+# Libraries the pipeline imports on first use. run_case imports them before
+# the clock starts, so the first ticker's stages are not charged for them.
+WARM_IMPORTS = ['sklearn.preprocessing', 'sklearn.metrics']
+MODEL_IMPORTS = {
+    'LinearRegression': ['sklearn.linear_model'],
+    'RandomForest': ['sklearn.ensemble'],
+    'XGBoost': ['xgboost'],
+    'LSTM': ['tensorflow'],
+    'BiLSTM': ['tensorflow'],
+}
+
+def _peak_rss_mb():
+    if resource is None:
+        return 0.0 # Not available on this platform
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in KB on Linux and bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+class StageTimer:
+    """Collects wall time and the process RSS high-water mark per stage."""
+
+    def __init__(self):
+        self.results = {}
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        yield
+        elapsed = time.perf_counter() - start
+        entry = self.results.setdefault(name, {'seconds': 0.0, 'peak_rss_mb': 0.0})
+        entry['seconds'] += elapsed
+        entry['peak_rss_mb'] = max(entry['peak_rss_mb'], _peak_rss_mb())
+
+def _seed_store(data_dir, ticker, df, source):
+    """Writes `n_bars`-long synthetic histories into the source's part of the price store."""
+    from src.price_store import PriceStore
+    start = df['Date'].iloc[0].strftime('%Y-%m-%d')
+    end = (df['Date'].iloc[-1] + pd.Timedelta(days=1)).strftime('%Y-%m-%d')
+    PriceStore(os.path.join(data_dir, 'store', source.cache_namespace)).merge(ticker, df, start, end)
+    return start, end
+
+def run_case(case):
+    """Runs one benchmark case and returns {stage: {seconds, peak_rss_mb}}."""
+    from src.data_loader import DataLoader
+    from src.feature_engineering import FeatureEngineer
+    from src.models import ModelTrainer
+    from src.risk_analysis import RiskAnalyzer
+
+    for module in WARM_IMPORTS + [m for name in case['models'] for m in MODEL_IMPORTS[name]]:
+        importlib.import_module(module)
+
+    timer = StageTimer()
+    source = SyntheticSource() # Anything not seeded is generated, never downloaded
+    with tempfile.TemporaryDirectory() as data_dir, contextlib.redirect_stdout(io.StringIO()):
+        tickers = [f"SYN{i:03d}" for i in range(case['tickers'])]
+        ranges = {t: _seed_store(data_dir, t, generate_prices(case['bars'], seed=i), source) for i, t in enumerate(tickers)}
+
+        for ticker in tickers:
+            start, end = ranges[ticker]
+            with timer.stage('load_data'):
+                df = DataLoader(ticker, start, end, data_dir=data_dir, source=source).load_data()
+            with timer.stage('prepare_matrix'):
+                features = FeatureEngineer(df).prepare_matrix()
+
+            if case['stages'] == 'full':
+                trainer = ModelTrainer(features, target_col='Close')
+                with timer.stage('split_data'):
+                    trainer.split_data()
+                for name in case['models']:
+                    with timer.stage(TRAIN_METHODS[name]):
+                        getattr(trainer, TRAIN_METHODS[name])()
+                    with timer.stage(f'predict[{name}]'):
+                        preds = trainer.predict(name)
+            else:
+                # Universe scan: score the recent closes instead of model output
+                preds = features.values[-252:, features.columns.index('Close')]
+
+            with timer.stage('get_risk_metrics'):
+                RiskAnalyzer(preds, preds).get_risk_metrics()
+    return timer.results
+
+def build_cases(bars, tickers, models):
+    cases = []
+    for n in bars:
+        cases.append({'id': f'full/bars={n}/tickers=1', 'bars': n, 'tickers': 1,
+                      'stages': 'full', 'models': models})
+    for t in tickers:
+        if t > 1:
+            cases.append({'id': f'universe/bars={min(bars)}/tickers={t}', 'bars': min(bars), 'tickers': t,
+                          'stages': 'universe', 'models': []})
+    return cases
+
+def compare(results, baseline, threshold, min_seconds):
+    """Returns a list of (case, stage, baseline_s, current_s) regressions."""
+    regressions = []
+    for case_id, stages in results.items():
+        for stage, entry in stages.items():
+            base = baseline.get(case_id, {}).get(stage)
+            if base is None:
+                continue
+            slower = entry['seconds'] - base['seconds']
+            if slower > min_seconds and entry['seconds'] > base['seconds'] * (1 + threshold):
+                regressions.append((case_id, stage, base['seconds'], entry['seconds']))
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Pipeline benchmark suite (offline, synthetic data)")
+    parser.add_argument('--bars', type=int, nargs='+', default=[1_000, 10_000, 100_000])
+    parser.add_argument('--tickers', type=int, nargs='+', default=[1, 10, 100, 500])
+    parser.add_argument('--models', nargs='+', default=['LinearRegression', 'RandomForest', 'XGBoost'],
+                        choices=list(TRAIN_METHODS), help='Models to train in the full cases')
+    parser.add_argument('--repeat', type=int, default=1, help='Runs per case; the fastest run is kept')
+    parser.add_argument('--save', help='Write results as a JSON baseline to this path')
+    parser.add_argument('--compare', help='Baseline JSON to check for regressions')
+    parser.add_argument('--threshold', type=float, default=0.25, help='Allowed slowdown (0.25 = 25%%)')
+    parser.add_argument('--min-seconds', type=float, default=0.01, help='Ignore slowdowns smaller than this')
+    args = parser.parse_args()
+
+    results = {}
+    ctx = get_context('spawn')
+    for case in build_cases(args.bars, args.tickers, args.models):
+        runs = []
+        for _ in range(args.repeat):
+            # A fresh process per run keeps the peak RSS specific to the case
+            with ctx.Pool(1) as pool:
+                runs.append(pool.apply(run_case, (case,)))
+        best = {stage: min((r[stage] for r in runs), key=lambda e: e['seconds']) for stage in runs[0]}
+        results[case['id']] = best
+        print(f"\n{case['id']}")
+        for stage, entry in best.items():
+            print(f"  {stage:<28} {entry['seconds']:>9.4f} s   peak RSS {entry['peak_rss_mb']:>8.1f} MB")
+
+    if args.save:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save)), exist_ok=True)
+        with open(args.save, 'w') as f:
+            json.dump({
+                'meta': {
+                    'created': datetime.now().isoformat(timespec='seconds'),
+                    'python': platform.python_version(),
+                    'numpy': np.__version__,
+                    'pandas': pd.__version__,
+                    'platform': platform.platform(),
+                    'cpu_count': os.cpu_count(),
+                },
+                'results': results,
+            }, f, indent=2)
+        print(f"\nBaseline saved to {args.save}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)['results']
+        regressions = compare(results, baseline, args.threshold, args.min_seconds)
+        if regressions:
+            print(f"\n{len(regressions)} stage(s) regressed by more than {args.threshold:.0%}:")
+            for case_id, stage, before, after in regressions:
+                print(f"  {case_id} {stage}: {before:.4f} s -> {after:.4f} s")
+            sys.exit(1)
+        print(f"\nNo regressions beyond {args.threshold:.0%} against {args.compare}")
+
+if __name__ == "__main__":
+    main()
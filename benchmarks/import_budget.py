@@ -0,0 +1,71 @@
+"""
+Import-time budget check for the CLI, the backend and the src modules.
+
+Each module is imported in a fresh interpreter. The check fails (exit status
+1) when an import takes longer than the budget, or when it pulls in one of the
+heavy libraries that should only load on first use.
+
+    python -m benchmarks.import_budget --budget 1.5
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEAVY_MODULES = ('sklearn', 'xgboost', 'tensorflow', 'matplotlib', 'seaborn', 'yfinance', 'joblib', 'uvicorn')
+
+# (label, module to import, working directory)
+TARGETS = [
+    ('src.models', 'src.models', ROOT),
+    ('src.data_loader', 'src.data_loader', ROOT),
+    ('src.visualization', 'src.visualization', ROOT),
+    ('src.evaluation', 'src.evaluation', ROOT),
+    ('src.backtesting', 'src.backtesting', ROOT),
+    ('src.model_registry', 'src.model_registry', ROOT),
+    ('main.py', 'main', ROOT),
+    ('backend/main.py', 'main', os.path.join(ROOT, 'backend')),
+]
+
+_PROBE = """
+import json, sys, time
+sys.path.insert(0, '.')
+start = time.perf_counter()
+__import__(sys.argv[1])
+elapsed = time.perf_counter() - start
+heavy = sorted({m for m in sys.argv[2:] if m in sys.modules})
+print(json.dumps({'seconds': elapsed, 'heavy': heavy}))
+"""
+
+def measure(module, cwd):
+    """Imports `module` in a new interpreter and returns {seconds, heavy}."""
+    out = subprocess.run([sys.executable, '-c', _PROBE, module, *HEAVY_MODULES],
+                         cwd=cwd, capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description="Check import time and lazy loading of heavy dependencies")
+    parser.add_argument('--budget', type=float, default=1.5, help='Maximum import time per module in seconds')
+    args = parser.parse_args()
+
+    failures = 0
+    for label, module, cwd in TARGETS:
+        result = measure(module, cwd)
+        problems = []
+        if result['seconds'] > args.budget:
+            problems.append(f"over budget ({args.budget:.2f} s)")
+        if result['heavy']:
+            problems.append(f"imports {', '.join(result['heavy'])}")
+        failures += bool(problems)
+        status = 'FAIL ' + '; '.join(problems) if problems else 'ok'
+        print(f"  {label:<22} {result['seconds']:>7.3f} s   {status}")
+
+    if failures:
+        print(f"\n{failures} module(s) failed the import budget")
+        sys.exit(1)
+    print("\nAll modules within the import budget")
+
+if __name__ == "__main__":
+    main()
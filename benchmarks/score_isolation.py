@@ -0,0 +1,76 @@
+"""
+Regression check for /score micro-batches with bad tickers in them.
+
+Registers one model on synthetic prices, then submits a single micro-batch
+to InferenceService mixing valid bars with empty, too short and unregistered
+ones. Every valid ticker must still get a prediction and every bad one its
+own error row; exits with status 1 otherwise (e.g. when one bad ticker fails
+the whole batch).
+
+    python -m benchmarks.score_isolation
+"""
+import contextlib
+import io
+import sys
+import tempfile
+
+import numpy as np
+
+from src.data_sources import generate_prices
+from src.dataset import SupervisedDatasetBuilder
+from src.feature_engineering import FeatureEngineer
+from src.inference import InferenceService
+from src.model_registry import ModelRegistry
+from src.models import ModelTrainer
+
+def register_model(registry, ticker, df):
+    """Fits and registers a small XGBoost model the way /predict does."""
+    features = FeatureEngineer(df).prepare_matrix()
+    trainer = ModelTrainer(features, target_col='Close')
+    trainer.load_dataset(SupervisedDatasetBuilder(features, 'Close', horizons=(1,)).build())
+    trainer.train_xgboost({'n_estimators': 20})
+    registry.save(registry.make_key(ticker, 'start', 'end', features.columns, 'XGBoost', {}, horizon=1),
+                  trainer.models['XGBoost'], trainer.scalers,
+                  meta={'ticker': ticker, 'model': 'XGBoost', 'end_date': 'end', 'horizon': 1,
+                        'feature_columns': features.columns, 'target_col': 'Close'})
+
+def columns(df):
+    return {c: df[c].to_numpy(dtype=np.float64) for c in ['Close', 'High', 'Low', 'Open', 'Volume']}
+
+def main():
+    df = generate_prices(600, seed=5)
+    bars = {
+        'MSFT': (columns(df), 'prediction'),
+        'EMPTY': ({'Close': np.empty(0)}, 'error'),
+        'SHORT': ({c: v[-20:] for c, v in columns(df).items()}, 'error'),
+        'NOMODEL': (columns(df), 'error'),
+        'MSFT2': (columns(df.iloc[:-1]), 'prediction'),
+    }
+    with tempfile.TemporaryDirectory() as registry_dir:
+        registry = ModelRegistry(registry_dir)
+        with contextlib.redirect_stdout(io.StringIO()):
+            for ticker in ('MSFT', 'MSFT2', 'SHORT'):
+                register_model(registry, ticker, df)
+        service = InferenceService(registry, max_wait_ms=500)
+        futures = {t: service.submit(t, b, 'XGBoost') for t, (b, _) in bars.items()}
+        try:
+            results = {t: f.result(timeout=60) for t, f in futures.items()}
+        except Exception as e:
+            print(f"FAIL the batch raised {e.__class__.__name__}: {e}")
+            sys.exit(1)
+
+    failures = 0
+    for ticker, (_, expected) in bars.items():
+        result = results[ticker]
+        ok = expected in result and result['batch']['batch_size'] == len(bars)
+        failures += not ok
+        detail = f"{result['prediction']:.2f}" if 'prediction' in result else result.get('error')
+        print(f"  {ticker:<8} {'ok' if ok else 'FAIL'}  {detail}")
+
+    if failures:
+        print(f"\n{failures} ticker(s) did not get their own result")
+        sys.exit(1)
+    print("\nBad tickers are reported per ticker without failing the batch")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Parity check between StreamingFeatureEngineer and the batch features.
+
+Feeds the same synthetic history to StreamingFeatureEngineer one bar at a
+time and in small DataFrame batches, and compares every emitted row with
+FeatureEngineer.prepare_data. Exits with status 1 when any feature differs by
+more than the tolerance, or when the two paths emit different rows.
+
+    python -m benchmarks.streaming_parity --tolerance 1e-9
+"""
+import argparse
+import sys
+
+import numpy as np
+import pandas as pd
+
+from src.data_sources import generate_prices
+from src.feature_engineering import FeatureEngineer, StreamingFeatureEngineer
+
+def stream(df, batch_size):
+    """Streaming features for df, fed in batches of batch_size rows (1 = bar by bar)."""
+    engineer = StreamingFeatureEngineer()
+    if batch_size == 1:
+        parts = [engineer.update(row) for _, row in df.iterrows()]
+    else:
+        parts = [engineer.update(df.iloc[i:i + batch_size]) for i in range(0, len(df), batch_size)]
+    return pd.concat([p for p in parts if len(p)], ignore_index=True)
+
+def max_difference(expected, actual):
+    """Largest relative difference over the feature columns, or None if the rows differ."""
+    if len(expected) != len(actual) or not (expected['Date'].to_numpy() == actual['Date'].to_numpy()).all():
+        return None
+    columns = [c for c in expected.columns if c != 'Date']
+    a = expected[columns].to_numpy(dtype=np.float64)
+    b = actual[columns].to_numpy(dtype=np.float64)
+    return float(np.max(np.abs(a - b) / np.maximum(np.abs(a), 1.0)))
+
+def main():
+    parser = argparse.ArgumentParser(description="Check StreamingFeatureEngineer against prepare_data")
+    parser.add_argument('--bars', type=int, default=1500, help='Length of the synthetic history')
+    parser.add_argument('--tolerance', type=float, default=1e-9, help='Maximum relative difference')
+    args = parser.parse_args()
+
+    df = generate_prices(args.bars, seed=7)
+    expected = FeatureEngineer(df).prepare_data().reset_index(drop=True)
+
+    failures = 0
+    for label, batch_size in [('single bars', 1), ('batches of 7', 7), ('batches of 250', 250)]:
+        diff = max_difference(expected, stream(df, batch_size))
+        if diff is None:
+            status = 'FAIL different rows'
+        elif diff > args.tolerance:
+            status = f'FAIL max difference {diff:.2e}'
+        else:
+            status = f'ok (max difference {diff:.2e})'
+        failures += not status.startswith('ok')
+        print(f"  {label:<16} {status}")
+
+    if failures:
+        print(f"\n{failures} streaming mode(s) drifted from the batch features")
+        sys.exit(1)
+    print("\nStreaming features match the batch features")
+
+if __name__ == "__main__":
+    main()
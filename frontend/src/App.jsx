@@ -38,7 +38,9 @@ function App() {
     setLoading(true);
     setError(null);
     try {
-      const response = await fetch('http://localhost:8081/predict', {
+      // Columnar chart data, downsampled to about one point per horizontal pixel
+      const maxPoints = Math.max(200, Math.round(window.innerWidth));
+      const response = await fetch(`http://localhost:8081/predict?chart_format=columnar&max_points=${maxPoints}`, {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
@@ -57,7 +59,8 @@ function App() {
       const result = await response.json();
 
       // Update Chart Data
-      setData(result.chart_data);
+      const { dates, actual, predicted } = result.chart;
+      setData(dates.map((date, i) => ({ date, actual: actual[i], predicted: predicted[i] })));
 
       // Update Metrics
       setMetrics({
@@ -2,19 +2,22 @@ import argparse
 import pandas as pd
 import numpy as np
 from src.data_loader import DataLoader
+from src.data_sources import SOURCES, get_source
+from src.dataset import SupervisedDatasetBuilder, horizon_arg
 from src.feature_engineering import FeatureEngineer
-from src.models import ModelTrainer
+from src.models import TRAIN_METHODS, ModelTrainer
 from src.risk_analysis import RiskAnalyzer
 from src.evaluation import evaluate_predictions
 from src.visualization import Visualizer
 
-def main(ticker='AAPL', start_date='2020-01-01', end_date='2023-01-01'):
+def main(ticker='AAPL', start_date='2020-01-01', end_date='2023-01-01', jobs=1, source=None, fast_deep=False,
+         plot_workers=2, horizons=(1,)):
     print("====================================")
     print("Risk-Aware Stock Price Forecasting")
     print("====================================")
 
     # 1. Data Ingestion
-    loader = DataLoader(ticker, start_date, end_date)
+    loader = DataLoader(ticker, start_date, end_date, source=get_source(source))
     df = loader.load_data()
     if df is None:
         return
@@ -22,36 +25,57 @@ def main(ticker='AAPL', start_date='2020-01-01', end_date='2023-01-01'):
     # 2. Feature Engineering
     print("\n[Step 2] Feature Engineering...")
     fe = FeatureEngineer(df)
-    df_features = fe.prepare_data()
-    print(f"Features created. New shape: {df_features.shape}")
-    print(f"Columns: {df_features.columns.tolist()}")
+    features = fe.prepare_matrix() # float32 block, passed to the trainer without copies
+    print(f"Features created. New shape: {features.values.shape}")
+    print(f"Columns: {features.columns}")
 
     # 3. Model Training
     print("\n[Step 3] Model Training...")
-    # Using 'Close' as target. Note: In a real scenario, we'd shift Target to be t+1. 
-    # Current setup predicts Close(t) using Features(t) which includes Lags of (t).
-    trainer = ModelTrainer(df_features, target_col='Close')
-    X_train, X_test, y_train, y_test = trainer.split_data()
+    # Using 'Close' `horizons` days ahead as targets, from the features known
+    # at the close of each day; several horizons are fitted together by each
+    # model. horizons=[0] keeps the old same-day setup (Close(t) from
+    # Features(t), which include Close(t) itself).
+    horizons = list(horizons)
+    trainer = ModelTrainer(features, target_col='Close')
+    trainer.fast_deep = fast_deep
+    if horizons != [0]:
+        trainer.load_dataset(SupervisedDatasetBuilder(features, 'Close', horizons=horizons).build())
+    else:
+        trainer.split_data()
 
     models_to_run = ['LinearRegression', 'RandomForest', 'XGBoost', 'LSTM', 'BiLSTM']
-    trained_models = {}
-    
-    trainer.train_linear_regression()
-    trainer.train_random_forest()
-    trainer.train_xgboost()
-    trainer.train_lstm()
-    trainer.train_bi_lstm()
-
-    # 4. Evaluation & Risk Analysis
-    print("\n[Step 4 & 5] Evaluation & Risk Analysis...")
-    visualizer = Visualizer()
+    # Results are reported per model, or per model and horizon
+    multi_horizon = len(horizons) > 1
+    labels = [f"{name}_t{h}" if multi_horizon else name for name in models_to_run for h in horizons]
+    # Charts render in worker processes while the next models train
+    visualizer = Visualizer(workers=plot_workers)
     results = {}
     risk_results = {}
 
-    for name in models_to_run:
-        print(f"\nEvaluating {name}...")
+    def report(label, actuals, preds):
+        # Evaluate Accuracy
+        metrics = evaluate_predictions(actuals, preds)
+        results[label] = metrics
+        print(f"  RMSE: {metrics['RMSE']:.4f}")
+        print(f"  MAPE: {metrics['MAPE']:.2f}%")
+
+        # Risk Analysis
+        risk_analyzer = RiskAnalyzer(actuals, preds)
+        r_metrics = risk_analyzer.get_risk_metrics()
+        score = risk_analyzer.risk_aware_decision_score(0, r_metrics) # Placeholder for return prediction
+        r_metrics['Decision Score'] = score
+        risk_results[label] = r_metrics
+        print(f"  VaR (95%): {r_metrics['VaR (95%)']:.4f}")
+        print(f"  Sharpe Ratio: {r_metrics['Sharpe Ratio']:.4f}")
+
+        # Visualization
+        visualizer.plot_actual_vs_predicted(actuals, preds, label)
+
+    # 4. Evaluation & Risk Analysis, run per model as soon as it is trained
+    def evaluate(name):
+        print(f"\n[Step 4 & 5] Evaluating {name}...")
         try:
-            # Get predictions
+            # Get predictions (all horizons in one call)
             preds = trainer.predict(name)
             # Get actuals (aligned with preds)
             actuals = trainer.get_actual_values(name)
@@ -61,30 +85,30 @@ def main(ticker='AAPL', start_date='2020-01-01', end_date='2023-01-01'):
             preds = preds[:min_len]
             actuals = actuals[:min_len]
 
-            # Evaluate Accuracy
-            metrics = evaluate_predictions(actuals, preds)
-            results[name] = metrics
-            print(f"  RMSE: {metrics['RMSE']:.4f}")
-            print(f"  MAPE: {metrics['MAPE']:.2f}%")
-
-            # Risk Analysis
-            risk_analyzer = RiskAnalyzer(actuals, preds)
-            r_metrics = risk_analyzer.get_risk_metrics()
-            score = risk_analyzer.risk_aware_decision_score(0, r_metrics) # Placeholder for return prediction
-            r_metrics['Decision Score'] = score
-            risk_results[name] = r_metrics
-            print(f"  VaR (95%): {r_metrics['VaR (95%)']:.4f}")
-            print(f"  Sharpe Ratio: {r_metrics['Sharpe Ratio']:.4f}")
-
-            # Visualization
-            visualizer.plot_actual_vs_predicted(actuals, preds, name)
+            if not multi_horizon:
+                report(name, actuals, preds)
+                return
+            for k, h in enumerate(horizons):
+                print(f"  t+{h}:")
+                report(f"{name}_t{h}", actuals[:, k], preds[:, k])
             
         except Exception as e:
             print(f"Error evaluating {name}: {e}")
 
-    # Comparative Plots
+    if jobs > 1:
+        # Models are independent once the data is split, so train them side by side
+        trainer.train_models_parallel(models_to_run, n_jobs=jobs, on_trained=evaluate)
+    else:
+        for name in models_to_run:
+            getattr(trainer, TRAIN_METHODS[name])()
+            evaluate(name)
+
+    # Comparative Plots (in run order, whatever order the models finished in)
+    results = {label: results[label] for label in labels if label in results}
+    risk_results = {label: risk_results[label] for label in labels if label in risk_results}
     visualizer.plot_model_performance(results)
     visualizer.plot_risk_comparison(risk_results)
+    visualizer.close()
 
     print("\n====================================")
     print("Final Analysis Complete.")
@@ -96,6 +120,19 @@ if __name__ == "__main__":
     parser.add_argument('--ticker', type=str, default='AAPL', help='Stock Ticker Symbol')
     parser.add_argument('--start', type=str, default='2020-01-01', help='Start Date (YYYY-MM-DD)')
     parser.add_argument('--end', type=str, default='2023-01-01', help='End Date (YYYY-MM-DD)')
+    parser.add_argument('--jobs', type=int, default=1, help='Number of models to train in parallel (1 = sequential)')
+    parser.add_argument('--source', choices=list(SOURCES), default=None,
+                        help='Price data source (defaults to $STOCK_DATA_SOURCE, then yfinance)')
+    parser.add_argument('--fast-deep', action='store_true',
+                        help='Train LSTM/BiLSTM with tf.data, adaptive batches, early stopping and XLA')
+    parser.add_argument('--plot-workers', type=int, default=2,
+                        help='Processes rendering charts in the background (0 = render inline)')
+    parser.add_argument('--horizons', type=horizon_arg, nargs='+', default=[1],
+                        help='Predict Close these many trading days ahead, all fitted at once '
+                             '(0 = same-day Close, look-ahead biased)')
     args = parser.parse_args()
+    if 0 in args.horizons and len(args.horizons) > 1:
+        parser.error("--horizons 0 (same-day Close) cannot be combined with other horizons")
     
-    main(args.ticker, args.start, args.end)
+    main(args.ticker, args.start, args.end, args.jobs, args.source, args.fast_deep, args.plot_workers,
+         args.horizons)
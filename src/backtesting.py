@@ -0,0 +1,166 @@
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+import numpy as np
+import pandas as pd
+
+from src.evaluation import evaluate_predictions
+from src.feature_engineering import FeatureMatrix
+from src.models import RANDOM_FOREST_PARAMS, XGBOOST_PARAMS, inverse_transform_column
+
+SUPPORTED_MODELS = ('LinearRegression', 'RandomForest', 'XGBoost')
+
+# Feature matrix shared with pool workers once, through the initializer
+_worker_features = None
+
+def _init_worker(features):
+    global _worker_features
+    _worker_features = features
+
+def _scale_fold(features, target_idx, train_end, test_end, horizon, scaler=None):
+    """
+    Scales both sides of the fold. A new scaler is fitted on the training rows
+    only, unless a fitted one is passed in (warm start keeps the first fold's).
+
+    Feature row t is paired with the target `horizon` rows later, so the last
+    `horizon` training rows are purged: their targets are test rows.
+    """
+    if scaler is None:
+        from sklearn.preprocessing import MinMaxScaler
+        scaler = MinMaxScaler().fit(features[:train_end])
+    scaled = scaler.transform(features[:train_end])
+    X_test = scaler.transform(features[train_end:test_end])
+    return scaler, scaled[:train_end - horizon], scaled[horizon:, target_idx], X_test
+
+def _new_model(model_name, params):
+    # Estimator libraries are imported on first use to keep module import cheap
+    if model_name == 'LinearRegression':
+        from sklearn.linear_model import LinearRegression
+        return LinearRegression()
+    if model_name == 'RandomForest':
+        from sklearn.ensemble import RandomForestRegressor
+        return RandomForestRegressor(**{**RANDOM_FOREST_PARAMS, **params})
+    from xgboost import XGBRegressor
+    return XGBRegressor(**{**XGBOOST_PARAMS, **params})
+
+def _score(features, target_idx, horizon, scaler, model, X_test, train_end, test_end):
+    """Predicts the test rows and scores them against the targets `horizon` rows later, in price units."""
+    preds = inverse_transform_column(scaler, model.predict(X_test), target_idx)
+    actuals = features[train_end + horizon:test_end + horizon, target_idx]
+    return evaluate_predictions(actuals, preds)
+
+def _run_cold_fold(model_name, params, target_idx, horizon, train_end, test_end):
+    """Scores one fold from scratch; runs in a pool worker."""
+    features = _worker_features
+    scaler, X_train, y_train, X_test = _scale_fold(features, target_idx, train_end, test_end, horizon)
+    model = _new_model(model_name, params)
+    model.fit(X_train, y_train)
+    return _score(features, target_idx, horizon, scaler, model, X_test, train_end, test_end)
+
+class WalkForwardBacktester:
+    """
+    Expanding-window walk-forward evaluation.
+
+    The numeric feature matrix is extracted once (or taken as is from a
+    FeatureMatrix) and every fold is a slice of it. As in
+    SupervisedDatasetBuilder, the features of row t forecast target_col
+    `horizon` rows later and the last `horizon` training rows of each fold
+    are purged, since their targets are test rows; horizon=0 is the
+    same-row setup of split_data. Scalers are fitted on
+    training rows only, so no test data leaks into the scaling. With
+    warm_start the model carries over between folds and is only extended with
+    the new data: XGBoost continues boosting from the previous booster
+    (xgb_model) and RandomForest adds trees (warm_start=True). The kept trees
+    split on scaled values, so warm start fits the scaler once, on the first
+    training window, and reuses it for every fold; refitting it would move
+    the old trees' thresholds and leaf values into different units. Later
+    rows may then fall outside [0, 1], which the trees and the inverse
+    transform handle. LinearRegression is cheap enough to refit. Without
+    warm_start folds are independent, each with its own scaler, and can run
+    in parallel worker processes.
+    """
+
+    def __init__(self, data, target_col='Close', min_train_size=252, test_size=21, step=None, horizon=1):
+        if isinstance(data, FeatureMatrix):
+            self.dates = pd.Series(data.dates)
+            self.columns = list(data.columns)
+            self.features = data.values
+        else:
+            if 'Date' in data.columns:
+                self.dates = pd.to_datetime(data['Date']).reset_index(drop=True)
+                numeric = data.drop(['Date'], axis=1)
+            else:
+                self.dates = pd.Series(data.index)
+                numeric = data
+            self.columns = list(numeric.columns)
+            self.features = numeric.to_numpy(dtype=np.float64)
+        self.target_idx = self.columns.index(target_col)
+        self.min_train_size = min_train_size
+        self.test_size = test_size
+        self.step = step or test_size
+        self.horizon = horizon
+        if horizon < 0 or min_train_size <= horizon:
+            raise ValueError(f"Horizon must be between 0 and min_train_size - 1, not {horizon}.")
+
+    def folds(self):
+        """
+        Returns (train_end, test_end) bounds of the feature rows; training
+        always starts at row 0 and test rows need a target `horizon` rows on.
+        """
+        n = len(self.features) - self.horizon
+        return [(train_end, min(train_end + self.test_size, n))
+                for train_end in range(self.min_train_size, n - 1, self.step)]
+
+    def _fit_warm(self, model, model_name, params, X_train, y_train, increment):
+        if model is None or model_name == 'LinearRegression':
+            model = _new_model(model_name, params)
+            model.fit(X_train, y_train)
+        elif model_name == 'RandomForest':
+            model.set_params(warm_start=True, n_estimators=model.n_estimators + increment)
+            model.fit(X_train, y_train)
+        else:
+            booster = model.get_booster()
+            model = _new_model(model_name, {**params, 'n_estimators': increment})
+            model.fit(X_train, y_train, xgb_model=booster)
+        return model
+
+    def run(self, model_name='XGBoost', params=None, warm_start=True, increment=10, n_jobs=1):
+        """
+        Runs every fold and returns a DataFrame with one row of metrics per fold.
+
+        increment: trees added per fold when warm starting RandomForest/XGBoost.
+        n_jobs: worker processes for independent (cold) folds.
+        """
+        if model_name not in SUPPORTED_MODELS:
+            raise ValueError(f"Walk-forward backtesting supports {SUPPORTED_MODELS}, not {model_name}")
+        params = params or {}
+        folds = self.folds()
+        print(f"Walk-forward backtest of {model_name} (t+{self.horizon}): {len(folds)} folds "
+              f"({'warm start' if warm_start else f'{n_jobs} jobs'})")
+
+        if warm_start:
+            metrics, model, scaler = [], None, None
+            for train_end, test_end in folds:
+                scaler, X_train, y_train, X_test = _scale_fold(self.features, self.target_idx,
+                                                               train_end, test_end, self.horizon, scaler)
+                model = self._fit_warm(model, model_name, params, X_train, y_train, increment)
+                metrics.append(_score(self.features, self.target_idx, self.horizon, scaler, model, X_test,
+                                      train_end, test_end))
+        elif n_jobs > 1:
+            with ProcessPoolExecutor(n_jobs, mp_context=get_context('spawn'),
+                                     initializer=_init_worker, initargs=(self.features,)) as pool:
+                futures = [pool.submit(_run_cold_fold, model_name, params, self.target_idx, self.horizon,
+                                       train_end, test_end)
+                           for train_end, test_end in folds]
+                metrics = [f.result() for f in futures]
+        else:
+            _init_worker(self.features)
+            metrics = [_run_cold_fold(model_name, params, self.target_idx, self.horizon, train_end, test_end)
+                       for train_end, test_end in folds]
+
+        # Test dates are those of the feature rows, i.e. when each forecast is made
+        results = pd.DataFrame(metrics)
+        results.insert(0, 'test_end', [self.dates.iloc[end - 1] for _, end in folds])
+        results.insert(0, 'test_start', [self.dates.iloc[end] for end, _ in folds])
+        results.insert(0, 'train_rows', [end - self.horizon for end, _ in folds])
+        return results
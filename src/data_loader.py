@@ -1,43 +1,99 @@
-import yfinance as yf
 import pandas as pd
 import os
+from collections import defaultdict
+from src import instrumentation
+from src.data_sources import get_source
+from src.price_store import PriceStore
+
+def _store_for(data_dir, source):
+    # Each source caches into its own part of the store so bars never mix
+    return PriceStore(os.path.join(data_dir, 'store', source.cache_namespace))
 
 class DataLoader:
-    def __init__(self, ticker, start_date, end_date, data_dir='data'):
+    def __init__(self, ticker, start_date, end_date, data_dir='data', source=None):
         self.ticker = ticker
         self.start_date = start_date
         self.end_date = end_date
         self.data_dir = data_dir
         os.makedirs(self.data_dir, exist_ok=True)
+        self.source = source or get_source()
+        self.store = _store_for(self.data_dir, self.source)
 
-    def fetch_data(self):
-        """Fetches historical data from Yahoo Finance."""
-        print(f"Fetching data for {self.ticker}...")
-        try:
-            df = yf.download(self.ticker, start=self.start_date, end=self.end_date, progress=False)
-            if df.empty:
-                raise ValueError("No data found for the given ticker and date range.")
-            
-            # Ensure columns are flat if MultiIndex (newer yfinance versions)
-            if isinstance(df.columns, pd.MultiIndex):
-                df.columns = df.columns.get_level_values(0)
-            
-            # Reset index to make Date a column
-            df.reset_index(inplace=True)
-            
-            save_path = os.path.join(self.data_dir, f"{self.ticker}_{self.start_date}_{self.end_date}.csv")
-            df.to_csv(save_path, index=False)
-            print(f"Data saved to {save_path}")
-            return df
-        except Exception as e:
-            print(f"Error fetching data: {e}")
-            return None
+    @instrumentation.timed('data_loader.fetch')
+    def fetch_data(self, start_date=None, end_date=None):
+        """Fetches historical data from the data source for [start, end) (defaults to the full request)."""
+        start_date = start_date or self.start_date
+        end_date = end_date or self.end_date
+        print(f"Fetching data for {self.ticker} from {self.source.name} ({start_date} to {end_date})...")
+        return self.source.fetch(self.ticker, start_date, end_date)
+
+    @classmethod
+    def prefetch(cls, tickers, start_date, end_date, data_dir='data', source=None):
+        """
+        Fills the price store for many tickers at once.
+
+        Missing ranges are grouped so that tickers needing the same range are
+        fetched together through the source's bulk fetch_many(). Returns the
+        tickers for which no data could be fetched.
+        """
+        source = source or get_source()
+        store = _store_for(data_dir, source)
+        groups = defaultdict(list)
+        for ticker in dict.fromkeys(tickers):
+            for missing in store.missing_ranges(ticker, start_date, end_date):
+                groups[missing].append(ticker)
+
+        failed = []
+        for (start, end), group in groups.items():
+            frames = source.fetch_many(group, start, end)
+            for ticker in group:
+                df = frames.get(ticker)
+                with PriceStore.lock(ticker):
+                    if df is None or (df.empty and store.read_meta(ticker) is None):
+                        failed.append(ticker)
+                        continue
+                    store.merge(ticker, df, start, end)
+        return failed
 
+    def _legacy_csv_path(self):
+        return os.path.join(self.data_dir, f"{self.ticker}_{self.start_date}_{self.end_date}.csv")
+
+    @instrumentation.timed('data_loader.load_data')
     def load_data(self):
-        """Loads data from CSV if exists, else fetches it."""
-        file_path = os.path.join(self.data_dir, f"{self.ticker}_{self.start_date}_{self.end_date}.csv")
-        if os.path.exists(file_path):
-            print(f"Loading data from local file: {file_path}")
-            return pd.read_csv(file_path)
-        else:
-            return self.fetch_data()
+        """
+        Loads data from the local price store, fetching only what is missing.
+
+        Ranges already covered are served as a slice of the stored history; a
+        missing head or tail is downloaded and merged in. CSV files written by
+        earlier versions for the exact range are imported instead of re-downloaded.
+        """
+        with PriceStore.lock(self.ticker):
+            missing = self.store.missing_ranges(self.ticker, self.start_date, self.end_date)
+            if missing:
+                legacy_path = self._legacy_csv_path()
+                meta = self.store.read_meta(self.ticker)
+                # Only import when the result stays one contiguous covered range
+                contiguous = meta is None or (pd.Timestamp(self.start_date) <= pd.Timestamp(meta['end'])
+                                              and pd.Timestamp(self.end_date) >= pd.Timestamp(meta['start']))
+                # Legacy files hold Yahoo Finance bars, so only that source imports them
+                if contiguous and self.source.name == 'yfinance' and os.path.exists(legacy_path):
+                    print(f"Importing local file into price store: {legacy_path}")
+                    self.store.merge(self.ticker, pd.read_csv(legacy_path), self.start_date, self.end_date)
+                    missing = self.store.missing_ranges(self.ticker, self.start_date, self.end_date)
+            instrumentation.cache_lookup('price_store', hit=not missing)
+
+            for start, end in missing:
+                df = self.fetch_data(start, end)
+                if df is None:
+                    return None
+                if df.empty and self.store.read_meta(self.ticker) is None:
+                    print("No data found for the given ticker and date range.")
+                    return None
+                self.store.merge(self.ticker, df, start, end)
+
+        print(f"Loading {self.ticker} {self.start_date} to {self.end_date} from price store")
+        df = self.store.get_range(self.ticker, self.start_date, self.end_date)
+        if df is None or df.empty:
+            print("No data found for the given ticker and date range.")
+            return None
+        return df
@@ -0,0 +1,263 @@
+import functools
+import hashlib
+import os
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+PRICE_COLUMNS = ['Close', 'High', 'Low', 'Open', 'Volume']
+
+def _normalize(df, start_date, end_date):
+    """Returns a Date + price column frame restricted to [start, end), or an empty one."""
+    if df is None or df.empty:
+        return pd.DataFrame(columns=['Date'] + PRICE_COLUMNS)
+    df = df.copy()
+    if 'Date' not in df.columns:
+        df = df.reset_index()
+        df = df.rename(columns={df.columns[0]: 'Date'})
+    df['Date'] = pd.to_datetime(df['Date'])
+    if getattr(df['Date'].dt, 'tz', None) is not None:
+        df['Date'] = df['Date'].dt.tz_localize(None)
+    mask = (df['Date'] >= pd.Timestamp(start_date)) & (df['Date'] < pd.Timestamp(end_date))
+    columns = ['Date'] + [c for c in PRICE_COLUMNS if c in df.columns]
+    return df.loc[mask, columns].dropna(subset=['Close']).reset_index(drop=True)
+
+def generate_prices(n_bars, seed=0, end_date='2024-12-31', s0=100.0, mu=0.0003, sigma=0.015, freq='D'):
+    """
+    Deterministic synthetic OHLCV bars (geometric Brownian motion) with the
+    same columns as the Yahoo Finance data, ending at end_date. The default
+    is one bar per calendar day, so 100k bars still fit in pandas' date range.
+
+    Each column draws from its own stream spawned from the seed, so the
+    first k bars are the same whatever n_bars is: a longer series only
+    appends bars.
+    """
+    seed_seq = np.random.SeedSequence(seed)
+    rng = np.random.default_rng(seed_seq)
+    open_rng, spread_rng, volume_rng = (np.random.default_rng(s) for s in seed_seq.spawn(3))
+    log_returns = rng.normal(mu - 0.5 * sigma ** 2, sigma, n_bars)
+    close = s0 * np.exp(np.cumsum(log_returns))
+    open_ = np.concatenate([[s0], close[:-1]]) * (1 + open_rng.normal(0, sigma / 4, n_bars))
+    spread = np.abs(spread_rng.normal(0, sigma / 2, n_bars))
+    high = np.maximum(open_, close) * (1 + spread)
+    low = np.minimum(open_, close) * (1 - spread)
+    volume = volume_rng.integers(1_000_000, 50_000_000, n_bars)
+    return pd.DataFrame({
+        'Date': pd.date_range(end=end_date, periods=n_bars, freq=freq),
+        'Close': close,
+        'High': high,
+        'Low': low,
+        'Open': open_,
+        'Volume': volume,
+    })
+
+class RateLimiter:
+    """Thread-safe token bucket allowing `rate` calls per second with bursts of `burst`."""
+
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Blocks until a token is available."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+class DataSource:
+    """
+    Interface for price providers used by DataLoader.
+
+    fetch() returns the bars of one ticker for [start, end) as a DataFrame with
+    a Date column and the PRICE_COLUMNS (empty when there is no data, None
+    when the fetch failed). fetch_many() does the same for a list of tickers
+    and returns {ticker: frame}; sources override it when they can do better
+    than one call per ticker.
+    """
+
+    name = 'base'
+
+    @property
+    def cache_namespace(self):
+        """Sub-directory of the price store holding this source's bars."""
+        return self.name
+
+    def fetch(self, ticker, start_date, end_date):
+        raise NotImplementedError
+
+    def fetch_many(self, tickers, start_date, end_date):
+        return {ticker: self.fetch(ticker, start_date, end_date) for ticker in tickers}
+
+class YFinanceSource(DataSource):
+    """
+    Yahoo Finance downloads.
+
+    fetch_many() splits the tickers into batches of `batch_size` and downloads
+    each batch with one multi-ticker request. Batches run on `max_workers`
+    threads sharing one HTTP session (so connections are reused), and every
+    request first takes a token from a rate limiter.
+    """
+
+    name = 'yfinance'
+
+    def __init__(self, batch_size=50, max_workers=4, requests_per_second=2.0):
+        self.batch_size = batch_size
+        self.max_workers = max_workers
+        self.limiter = RateLimiter(requests_per_second, burst=max_workers)
+        self._session = None
+        self._session_lock = threading.Lock()
+
+    @property
+    def cache_namespace(self):
+        return '' # Top level of the store, where earlier versions kept Yahoo data
+
+    def _get_session(self):
+        with self._session_lock:
+            if self._session is None:
+                try:
+                    from curl_cffi import requests as curl_requests
+                    self._session = curl_requests.Session(impersonate='chrome')
+                except ImportError:
+                    self._session = False # Let yfinance manage its own session
+            return self._session or None
+
+    def _download(self, tickers, start_date, end_date):
+        import yfinance as yf # Lazy import: only needed when bars are missing locally
+        self.limiter.acquire()
+        return yf.download(tickers, start=start_date, end=end_date, group_by='ticker',
+                           auto_adjust=True, threads=False, progress=False, session=self._get_session())
+
+    @staticmethod
+    def _split(df, ticker):
+        if df is None:
+            return None
+        if isinstance(df.columns, pd.MultiIndex):
+            if ticker not in df.columns.get_level_values(0):
+                return None
+            df = df[ticker]
+        return df.dropna(how='all')
+
+    def fetch(self, ticker, start_date, end_date):
+        try:
+            df = self._download([ticker], start_date, end_date)
+            return _normalize(self._split(df, ticker), start_date, end_date)
+        except Exception as e:
+            print(f"Error fetching data for {ticker}: {e}")
+            return None
+
+    def _fetch_batch(self, batch, start_date, end_date):
+        try:
+            df = self._download(batch, start_date, end_date)
+        except Exception as e:
+            print(f"Error fetching batch of {len(batch)} tickers: {e}")
+            return {ticker: None for ticker in batch}
+        frames = {}
+        for ticker in batch:
+            part = self._split(df, ticker)
+            frames[ticker] = None if part is None else _normalize(part, start_date, end_date)
+        return frames
+
+    def fetch_many(self, tickers, start_date, end_date):
+        tickers = list(dict.fromkeys(tickers))
+        batches = [tickers[i:i + self.batch_size] for i in range(0, len(tickers), self.batch_size)]
+        print(f"Fetching {len(tickers)} tickers in {len(batches)} batch(es) ({start_date} to {end_date})...")
+        frames = {}
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(batches)) or 1) as pool:
+            for result in pool.map(lambda b: self._fetch_batch(b, start_date, end_date), batches):
+                frames.update(result)
+        return frames
+
+class LocalDirectorySource(DataSource):
+    """
+    Reads bars from a directory holding one file per ticker, named
+    <TICKER>.parquet or <TICKER>.csv, with a Date column (or index) and the
+    usual price columns.
+    """
+
+    name = 'local'
+
+    def __init__(self, directory):
+        self.directory = os.path.abspath(directory)
+
+    @property
+    def cache_namespace(self):
+        # Different directories must not share cached bars
+        return f"local-{hashlib.sha1(self.directory.encode('utf-8')).hexdigest()[:10]}"
+
+    def fetch(self, ticker, start_date, end_date):
+        for ext, reader in (('.parquet', pd.read_parquet), ('.csv', pd.read_csv)):
+            path = os.path.join(self.directory, f"{ticker}{ext}")
+            if os.path.exists(path):
+                return _normalize(reader(path), start_date, end_date)
+        print(f"No local file for {ticker} in {self.directory}")
+        return None
+
+class SyntheticSource(DataSource):
+    """
+    Deterministic synthetic prices for offline runs and CI.
+
+    Each ticker gets its own business-day GBM series starting at
+    SERIES_START, seeded from the ticker name, so any [start, end) request
+    returns the same bars no matter how the range is split across calls.
+    """
+
+    name = 'synthetic'
+    SERIES_START = '2000-01-03'
+
+    def __init__(self, seed=0, mu=0.0003, sigma=0.015):
+        self.seed = seed
+        self.mu = mu
+        self.sigma = sigma
+
+    @property
+    def cache_namespace(self):
+        # v2: Open/High/Low/Volume no longer depend on the requested end date,
+        # so bars stored by the old generator are not mixed with new ones
+        return f"synthetic-{self.seed}-v2"
+
+    def fetch(self, ticker, start_date, end_date):
+        days = pd.bdate_range(self.SERIES_START, pd.Timestamp(end_date) - pd.Timedelta(days=1))
+        if len(days) == 0:
+            return _normalize(None, start_date, end_date)
+        seed = [self.seed, zlib.crc32(ticker.upper().encode('utf-8'))]
+        df = generate_prices(len(days), seed=seed, end_date=days[-1], mu=self.mu, sigma=self.sigma, freq='B')
+        return _normalize(df, start_date, end_date)
+
+SOURCES = {
+    'yfinance': YFinanceSource,
+    'local': LocalDirectorySource,
+    'synthetic': SyntheticSource,
+}
+
+@functools.lru_cache(maxsize=None)
+def _shared_source(name, directory):
+    if name == 'local':
+        return LocalDirectorySource(directory)
+    return SOURCES[name]()
+
+def get_source(name=None):
+    """
+    Returns the shared data source for `name`, defaulting to the
+    STOCK_DATA_SOURCE environment variable ('yfinance' if unset). The local
+    source reads its directory from STOCK_DATA_DIR. Instances are shared per
+    process so that concurrent loaders use one session and one rate limiter.
+    """
+    name = name or os.environ.get('STOCK_DATA_SOURCE', 'yfinance')
+    if name not in SOURCES:
+        raise ValueError(f"Unknown data source '{name}', expected one of {list(SOURCES)}")
+    directory = os.path.abspath(os.environ.get('STOCK_DATA_DIR', 'data/local')) if name == 'local' else None
+    return _shared_source(name, directory)
@@ -0,0 +1,98 @@
+import argparse
+from collections import namedtuple
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from src.feature_engineering import FeatureMatrix
+
+# Train/test arrays built by SupervisedDatasetBuilder. Y_* have one column per
+# horizon: Y[i, k] is the scaled target horizons[k] rows after feature row i.
+# The dates are those of the feature rows, i.e. when each forecast is made.
+SupervisedDataset = namedtuple('SupervisedDataset', [
+    'X_train', 'X_test', 'Y_train', 'Y_test', 'horizons', 'columns', 'target_idx', 'scaler',
+    'train_dates', 'test_dates',
+])
+
+def horizon_arg(value):
+    """argparse type for a horizon: a whole number of rows ahead, 0 meaning the same-row target."""
+    try:
+        horizon = int(value)
+    except ValueError:
+        horizon = -1
+    if horizon < 0:
+        raise argparse.ArgumentTypeError(f"invalid horizon {value!r}: expected a whole number of days ahead (0 = same day)")
+    return horizon
+
+def _lead_columns(lead, horizons):
+    """Columns `horizons` of the lead view; a strided view when they are evenly spaced."""
+    if len(horizons) == 1:
+        return lead[:, horizons[0]:horizons[0] + 1]
+    step = horizons[1] - horizons[0]
+    if step > 0 and all(b - a == step for a, b in zip(horizons, horizons[1:])):
+        return lead[:, horizons[0]:horizons[-1] + 1:step]
+    return lead[:, list(horizons)] # Uneven horizons: one (rows, len(horizons)) gather
+
+class SupervisedDatasetBuilder:
+    """
+    Look-ahead-free supervised arrays for forecasting target_col h rows ahead,
+    for several horizons at once.
+
+    Feature row t (everything known at the close of t) is paired with the
+    target at row t + h. The feature matrix is scaled once, with the scaler
+    fitted on training rows only; X is a slice of the scaled block and the
+    targets are shifted slices of its target column, so the horizons share
+    storage instead of each getting a copied frame. The last max(horizons)
+    training rows are purged because their targets fall in the test period.
+    """
+
+    def __init__(self, data, target_col='Close', horizons=(1,), test_size=0.2, purge=True):
+        self.data = data # FeatureMatrix, or DataFrame of features
+        self.target_col = target_col
+        self.horizons = tuple(int(h) for h in horizons)
+        self.test_size = test_size
+        self.purge = purge
+        if not self.horizons or min(self.horizons) < 1:
+            raise ValueError("Horizons must be positive numbers of rows ahead.")
+
+    def _matrix(self):
+        if isinstance(self.data, FeatureMatrix):
+            return self.data.values, list(self.data.columns), np.asarray(self.data.dates)
+        df = self.data
+        if 'Date' in df.columns:
+            dates = df['Date'].to_numpy()
+            df = df.drop(columns=['Date'])
+        else:
+            dates = df.index.to_numpy()
+        return df.to_numpy(), list(df.columns), dates
+
+    def build(self, scaler=None):
+        """
+        Returns a SupervisedDataset. A fitted scaler (e.g. from the model
+        registry) is reused instead of fitting a new one.
+        """
+        values, columns, dates = self._matrix()
+        max_h = max(self.horizons)
+        n_samples = len(values) - max_h # Feature rows whose every target exists
+        train_end = int(n_samples * (1 - self.test_size))
+        fit_end = train_end - max_h if self.purge else train_end
+        if fit_end <= 0 or train_end >= n_samples:
+            raise ValueError(f"Not enough rows ({len(values)}) for horizons {self.horizons}.")
+
+        if scaler is None:
+            from sklearn.preprocessing import MinMaxScaler
+            scaler = MinMaxScaler().fit(values[:train_end])
+        scaled = scaler.transform(values)
+        target_idx = columns.index(self.target_col)
+
+        # lead[t, h] is the target h rows after t: a strided view, nothing copied
+        lead = sliding_window_view(scaled[:, target_idx], max_h + 1)[:n_samples]
+        Y = _lead_columns(lead, self.horizons)
+        X = scaled[:n_samples]
+
+        print(f"Dataset: horizons {self.horizons}, train {X[:fit_end].shape}, test {X[train_end:].shape}"
+              + (f", {train_end - fit_end} rows purged" if fit_end < train_end else ""))
+        return SupervisedDataset(
+            X_train=X[:fit_end], X_test=X[train_end:],
+            Y_train=Y[:fit_end], Y_test=Y[train_end:],
+            horizons=self.horizons, columns=columns, target_idx=target_idx, scaler=scaler,
+            train_dates=dates[:fit_end], test_dates=dates[train_end:n_samples],
+        )
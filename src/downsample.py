@@ -0,0 +1,38 @@
+import numpy as np
+
+def lttb_indices(values, n_out):
+    """
+    Largest-Triangle-Three-Buckets downsampling.
+
+    Returns the sorted row indices of `n_out` points that keep the visual
+    shape of the series: the first and last rows are always kept and every
+    bucket in between contributes the point forming the largest triangle with
+    the previously kept point and the mean of the next bucket. Rows are taken
+    as evenly spaced on the x axis (one per bar). `values` may be 2-D
+    (rows x series); the triangle areas are then summed over the series so
+    all of them share one set of indices.
+    """
+    y = np.asarray(values, dtype=np.float64)
+    if y.ndim == 1:
+        y = y[:, None]
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    # n_out - 2 inner buckets over rows 1 .. n-2
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    indices = np.empty(n_out, dtype=np.int64)
+    indices[0], indices[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        if i + 2 < len(edges):
+            next_lo, next_hi = edges[i + 1], edges[i + 2]
+            avg_x, avg_y = (next_lo + next_hi - 1) / 2, y[next_lo:next_hi].mean(axis=0)
+        else:
+            avg_x, avg_y = n - 1, y[n - 1]
+        xs = np.arange(lo, hi)
+        area = np.abs((a - avg_x) * (y[lo:hi] - y[a]) - (a - xs)[:, None] * (avg_y - y[a])).sum(axis=1)
+        a = lo + int(np.argmax(area))
+        indices[i + 1] = a
+    return indices
@@ -1,5 +1,4 @@
 import numpy as np
-from sklearn.metrics import mean_squared_error, mean_absolute_error
 
 def mean_absolute_percentage_error(y_true, y_pred): 
     return np.mean(np.abs((y_true - y_pred) / y_true)) * 100
@@ -13,6 +12,7 @@ def directional_accuracy(y_true, y_pred):
     return np.mean(matches) * 100
 
 def evaluate_predictions(y_true, y_pred):
+    from sklearn.metrics import mean_squared_error, mean_absolute_error # Lazy: sklearn is slow to import
     rmse = np.sqrt(mean_squared_error(y_true, y_pred))
     mae = mean_absolute_error(y_true, y_pred)
     mape = mean_absolute_percentage_error(y_true, y_pred)
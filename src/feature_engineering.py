@@ -1,5 +1,55 @@
 import pandas as pd
 import numpy as np
+from collections import deque, namedtuple
+from functools import lru_cache
+from src import instrumentation
+
+# Features as 2-D block: values (n_rows, n_features), column names and row dates
+FeatureMatrix = namedtuple('FeatureMatrix', ['values', 'columns', 'dates'])
+
+# Bars needed to compute the features of the latest bar: MA_200 needs 200, and
+# the extra warm-up lets the MACD EWMs forget their starting value (its weight
+# after 300 bars is below 1e-10), so the result matches the full history.
+FEATURE_LOOKBACK = 300
+
+# Bars before every feature of a row is defined (MA_200 is the longest window)
+MIN_FEATURE_BARS = 200
+
+def _rsi(prices, window):
+    delta = prices.diff()
+    gain = (delta.where(delta > 0, 0)).rolling(window=window).mean()
+    loss = (-delta.where(delta < 0, 0)).rolling(window=window).mean()
+    rs = gain / loss
+    return 100 - (100 / (1 + rs))
+
+def _macd(prices, slow, fast, signal):
+    exp1 = prices.ewm(span=fast, adjust=False).mean()
+    exp2 = prices.ewm(span=slow, adjust=False).mean()
+    macd = exp1 - exp2
+    return macd, macd.ewm(span=signal, adjust=False).mean()
+
+def _returns_and_volatility(prices, window):
+    daily_return = prices.pct_change()
+    return daily_return, daily_return.rolling(window=window).std()
+
+def _indicators(prices):
+    """
+    Yields (name, values) for every indicator, in prepare_data's column order.
+
+    Works on a price Series (one ticker) or a DataFrame with one column per
+    ticker, in which case each indicator is a single call across all tickers.
+    """
+    yield 'RSI', _rsi(prices, 14)
+    macd, signal = _macd(prices, 26, 12, 9)
+    yield 'MACD', macd
+    yield 'Signal_Line', signal
+    for w in [20, 50, 200]:
+        yield f'MA_{w}', prices.rolling(window=w).mean()
+    daily_return, volatility = _returns_and_volatility(prices, 20)
+    yield 'Daily_Return', daily_return
+    yield 'Volatility', volatility
+    for lag in [1, 2, 3, 5]:
+        yield f'Lag_{lag}', prices.shift(lag)
 
 class FeatureEngineer:
     def __init__(self, df):
@@ -12,19 +62,12 @@ class FeatureEngineer:
 
     def compute_rsi(self, window=14, col='Close'):
         """Computes Relative Strength Index (RSI)."""
-        delta = self.df[col].diff()
-        gain = (delta.where(delta > 0, 0)).rolling(window=window).mean()
-        loss = (-delta.where(delta < 0, 0)).rolling(window=window).mean()
-        rs = gain / loss
-        self.df['RSI'] = 100 - (100 / (1 + rs))
+        self.df['RSI'] = _rsi(self.df[col], window)
         return self.df
 
     def compute_macd(self, slow=26, fast=12, signal=9, col='Close'):
         """Computes Moving Average Convergence Divergence (MACD)."""
-        exp1 = self.df[col].ewm(span=fast, adjust=False).mean()
-        exp2 = self.df[col].ewm(span=slow, adjust=False).mean()
-        self.df['MACD'] = exp1 - exp2
-        self.df['Signal_Line'] = self.df['MACD'].ewm(span=signal, adjust=False).mean()
+        self.df['MACD'], self.df['Signal_Line'] = _macd(self.df[col], slow, fast, signal)
         return self.df
 
     def compute_moving_averages(self, windows=[20, 50, 200], col='Close'):
@@ -39,8 +82,7 @@ class FeatureEngineer:
         # Requirement says: "Volatility (standard deviation of returns)" in the Risk section,
         # but for feature engineering, price volatility is also useful. 
         # I'll add daily returns and their rolling std dev.
-        self.df['Daily_Return'] = self.df[col].pct_change()
-        self.df['Volatility'] = self.df['Daily_Return'].rolling(window=window).std()
+        self.df['Daily_Return'], self.df['Volatility'] = _returns_and_volatility(self.df[col], window)
         return self.df
 
     def create_lag_features(self, lags=[1, 2, 3, 5], col='Close'):
@@ -49,6 +91,7 @@ class FeatureEngineer:
             self.df[f'Lag_{lag}'] = self.df[col].shift(lag)
         return self.df
 
+    @instrumentation.timed('features.prepare_data')
     def prepare_data(self):
         """Runs all feature generation methods and cleans NaN values."""
         self.compute_rsi()
@@ -60,3 +103,362 @@ class FeatureEngineer:
         # Drop rows with NaN created by windowing/shifting
         self.df.dropna(inplace=True)
         return self.df
+
+    @instrumentation.timed('features.prepare_matrix')
+    def prepare_matrix(self, dtype=np.float32):
+        """
+        Same features as prepare_data, assembled into one preallocated block.
+
+        Each indicator is computed on the 1-D price series and written straight
+        into its column of a (n_rows, n_features) array of `dtype`, instead of
+        being added to the DataFrame one column at a time. float32 halves the
+        memory and is what XGBoost and TensorFlow train on natively; pass
+        dtype=np.float64 for exactness checks against prepare_data.
+        Returns a FeatureMatrix that ModelTrainer accepts directly.
+        """
+        base_columns = [c for c in self.df.columns if c != 'Date']
+        indicators = list(_indicators(self.df['Close']))
+        columns = base_columns + [name for name, _ in indicators]
+
+        values = np.empty((len(self.df), len(columns)), dtype=dtype)
+        for j, c in enumerate(base_columns):
+            values[:, j] = self.df[c].to_numpy()
+        for j, (_, series) in enumerate(indicators, start=len(base_columns)):
+            values[:, j] = series.to_numpy()
+
+        # Rows with NaN are dropped as in prepare_data. Warm-up NaNs sit at the
+        # head, so the valid rows are usually a contiguous tail and a view.
+        valid = ~np.isnan(values).any(axis=1)
+        first = int(np.argmax(valid)) if valid.any() else len(valid)
+        rows = slice(first, None) if valid[first:].all() else valid
+        dates = self.df['Date'].to_numpy()[rows] if 'Date' in self.df.columns else self.df.index.to_numpy()[rows]
+        return FeatureMatrix(values[rows], columns, dates)
+
+    def latest_features(self, n_rows=1, lookback=FEATURE_LOOKBACK, dtype=np.float32):
+        """
+        Features of the last n_rows bars only, computed from the trailing
+        lookback + n_rows - 1 bars instead of the whole history. Meant for
+        scoring new bars with an already trained model.
+        """
+        tail = self.df.tail(lookback + n_rows - 1)
+        features = FeatureEngineer(tail).prepare_matrix(dtype=dtype)
+        return FeatureMatrix(features.values[-n_rows:], features.columns, features.dates[-n_rows:])
+
+
+@lru_cache(maxsize=32)
+def _ewm_weights(n_rows, span):
+    """(n_rows x n_rows) lower-triangular weights of an adjust=False EWM started at row 0."""
+    alpha = 2 / (span + 1)
+    lags = np.subtract.outer(np.arange(n_rows), np.arange(n_rows))
+    weights = np.where(lags >= 0, alpha * (1 - alpha) ** np.maximum(lags, 0), 0.0)
+    weights[:, 0] = (1 - alpha) ** np.arange(n_rows)
+    return weights
+
+def _ewm_rows(series_rows, span):
+    """
+    adjust=False EWM down the rows of a 2-D array, as pandas computes it. Each
+    column's leading NaNs are filled with its first value, which leaves the
+    EWM from that value on unchanged, so it is one matrix product.
+    """
+    missing = np.isnan(series_rows)
+    first = series_rows[missing.argmin(axis=0), np.arange(series_rows.shape[1])]
+    filled = np.where(missing, first, series_rows)
+    return _ewm_weights(len(series_rows), span) @ filled
+
+def _latest_indicators(closes):
+    """
+    Yields (name, values) like _indicators, but only for the last row of a
+    (rows x tickers) close matrix, using plain NumPy reductions over the
+    trailing window of each indicator.
+    """
+    with np.errstate(divide='ignore', invalid='ignore'):
+        if len(closes) >= 15:
+            delta = np.diff(closes[-15:], axis=0)
+            gain = np.where(delta > 0, delta, 0).mean(axis=0)
+            loss = np.where(delta < 0, -delta, 0).mean(axis=0)
+            yield 'RSI', 100 - 100 / (1 + gain / loss)
+        else:
+            yield 'RSI', np.full(closes.shape[1], np.nan)
+        # MACD is 0 over any padded head, like at each ticker's first bar, so the signal line matches too
+        macd = _ewm_rows(closes, 12) - _ewm_rows(closes, 26)
+        yield 'MACD', macd[-1]
+        yield 'Signal_Line', _ewm_rows(macd, 9)[-1]
+        for w in [20, 50, 200]:
+            yield f'MA_{w}', closes[-w:].mean(axis=0) if len(closes) >= w else np.full(closes.shape[1], np.nan)
+        returns = closes[-21:][1:] / closes[-21:][:-1] - 1
+        yield 'Daily_Return', returns[-1] if len(returns) else np.full(closes.shape[1], np.nan)
+        yield 'Volatility', returns.std(axis=0, ddof=1) if len(returns) >= 20 else np.full(closes.shape[1], np.nan)
+        for lag in [1, 2, 3, 5]:
+            yield f'Lag_{lag}', closes[-1 - lag] if len(closes) > lag else np.full(closes.shape[1], np.nan)
+
+def _last(values, default):
+    values = np.asarray(values)
+    return values[-1] if len(values) else default
+
+def latest_feature_rows(bars_by_ticker, lookback=FEATURE_LOOKBACK, dtype=np.float32):
+    """
+    Feature row of the most recent bar of each ticker, from at most
+    `lookback` trailing bars each.
+
+    bars_by_ticker maps ticker -> bars, oldest first, as a DataFrame or a dict
+    of column -> 1-D array (cheaper to read), with an optional Date column. The tails are right-aligned in one (lookback x tickers)
+    matrix and each indicator is one NumPy reduction across all tickers. Columns are
+    the bar columns followed by the indicators, as in prepare_matrix. Rows of
+    tickers with too little history (or none) contain NaN.
+    Returns a FeatureMatrix with one row per ticker (in input order) and the
+    date of each ticker's last bar.
+    """
+    tickers = list(bars_by_ticker)
+    frames = [bars_by_ticker[t] for t in tickers]
+    base_columns = [c for c in frames[0] if c != 'Date'] if frames else []
+    # At least one (all-NaN) row, so the indicators stay defined when every ticker is empty
+    n_rows = max(min(max((len(df['Close']) for df in frames), default=0), lookback), 1)
+
+    closes = np.full((n_rows, len(tickers)), np.nan)
+    for j, df in enumerate(frames):
+        close = np.asarray(df['Close'])
+        tail = close[max(len(close) - n_rows, 0):]
+        closes[n_rows - len(tail):, j] = tail
+    indicators = list(_latest_indicators(closes))
+    columns = base_columns + [name for name, _ in indicators]
+
+    values = np.empty((len(tickers), len(columns)), dtype=dtype)
+    for i, df in enumerate(frames):
+        values[i, :len(base_columns)] = [_last(df[c], np.nan) for c in base_columns]
+    for j, (_, last_row) in enumerate(indicators, start=len(base_columns)):
+        values[:, j] = last_row
+    dates = np.array([_last(df['Date'] if 'Date' in df else getattr(df, 'index', []), None) for df in frames])
+    return FeatureMatrix(values, columns, dates)
+
+class PanelFeatureEngineer:
+    """
+    Cross-sectional feature computation for a whole universe at once.
+
+    Takes a (dates x tickers) price matrix and computes each indicator for all
+    tickers with one vectorized rolling/EWM call, instead of one pandas call
+    per ticker. The result can be read as a 3-D array, a tidy long frame or a
+    per-ticker FeatureMatrix for ModelTrainer, whose rows match that
+    ticker's FeatureEngineer.prepare_matrix. Only the price column itself
+    and the indicators derived from it are included (no Open/High/Low/Volume).
+    """
+
+    def __init__(self, prices, dtype=np.float32):
+        self.prices = prices.sort_index()
+        self.dtype = dtype
+        self.columns = None
+        self.values = None # (n_tickers, n_dates, n_features)
+
+    @classmethod
+    def from_frames(cls, frames, col='Close', dtype=np.float32):
+        """Builds the panel from {ticker: OHLCV DataFrame with a Date column}."""
+        dates = {ticker: pd.to_datetime(df['Date'], cache=False).to_numpy() for ticker, df in frames.items()}
+        index = np.unique(np.concatenate(list(dates.values())))
+        # Place each ticker on the union of dates (NaN where it has no bar;
+        # compute() still runs the indicators over each ticker's own bars)
+        values = np.full((len(index), len(frames)), np.nan)
+        for j, (ticker, df) in enumerate(frames.items()):
+            values[np.searchsorted(index, dates[ticker]), j] = df[col].to_numpy()
+        prices = pd.DataFrame(values, index=pd.DatetimeIndex(index, name='Date'), columns=list(frames))
+        return cls(prices, dtype=dtype)
+
+    @property
+    def tickers(self):
+        return list(self.prices.columns)
+
+    @property
+    def dates(self):
+        return self.prices.index.to_numpy()
+
+    def compute(self):
+        """
+        Computes every indicator for all tickers into one preallocated 3-D block.
+
+        Tickers trade on different calendars, so the indicators are not run
+        on the union of dates: a NaN gap there would void every window and
+        return spanning it. Instead each ticker's bars are packed by rank
+        (row k holds its k-th bar), the vectorized calls run on that block,
+        and the results are scattered back to the dates the ticker has a bar
+        on. Dates without a bar stay NaN.
+        """
+        prices = self.prices.to_numpy(dtype=np.float64)
+        has_bar = ~np.isnan(prices)
+        rank = np.cumsum(has_bar, axis=0) - 1
+        rows, cols = np.nonzero(has_bar)
+        packed_rows = rank[rows, cols]
+        packed = np.full((int(has_bar.sum(axis=0).max(initial=0)), prices.shape[1]), np.nan)
+        packed[packed_rows, cols] = prices[rows, cols]
+        packed = pd.DataFrame(packed, columns=self.prices.columns)
+
+        indicators = [('Close', packed)] + list(_indicators(packed))
+        self.columns = [name for name, _ in indicators]
+        self.values = np.full((len(self.tickers), len(self.prices), len(self.columns)), np.nan, dtype=self.dtype)
+        for k, (_, frame) in enumerate(indicators):
+            self.values[cols, rows, k] = frame.to_numpy()[packed_rows, cols]
+        return self.values
+
+    def feature_matrix(self, ticker):
+        """FeatureMatrix of one ticker with warm-up/missing rows dropped, ready for ModelTrainer."""
+        if self.values is None:
+            self.compute()
+        block = self.values[self.tickers.index(ticker)]
+        valid = ~np.isnan(block).any(axis=1)
+        return FeatureMatrix(block[valid], list(self.columns), self.dates[valid])
+
+    def to_long_frame(self):
+        """Tidy frame with one row per (Date, Ticker) and one column per feature."""
+        if self.values is None:
+            self.compute()
+        n_tickers, n_dates, _ = self.values.shape
+        long = pd.DataFrame(self.values.reshape(n_tickers * n_dates, -1), columns=self.columns)
+        long.insert(0, 'Ticker', np.repeat(self.tickers, n_dates))
+        long.insert(0, 'Date', np.tile(self.dates, n_tickers))
+        return long.dropna().reset_index(drop=True)
+
+
+class _RollingMean:
+    """Fixed-window mean over a ring buffer with a running sum."""
+
+    def __init__(self, window):
+        self.window = window
+        self.values = deque()
+        self.total = 0.0
+        self.nonzero = 0
+
+    def update(self, x):
+        self.values.append(x)
+        self.total += x
+        self.nonzero += x != 0
+        if len(self.values) > self.window:
+            old = self.values.popleft()
+            self.total -= old
+            self.nonzero -= old != 0
+        if len(self.values) < self.window:
+            return np.nan
+        # An all-zero window is exactly zero in the batch version too
+        if self.nonzero == 0:
+            self.total = 0.0
+        return self.total / self.window
+
+
+class _RollingStd:
+    """Fixed-window sample standard deviation with Welford add/remove updates."""
+
+    def __init__(self, window):
+        self.window = window
+        self.values = deque()
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def update(self, x):
+        self.values.append(x)
+        n = len(self.values)
+        delta = x - self.mean
+        self.mean += delta / n
+        self.m2 += delta * (x - self.mean)
+        if n > self.window:
+            old = self.values.popleft()
+            n -= 1
+            old_mean = self.mean
+            self.mean -= (old - old_mean) / n
+            self.m2 -= (old - old_mean) * (old - self.mean)
+        if n < self.window:
+            return np.nan
+        return np.sqrt(max(self.m2, 0.0) / (n - 1))
+
+
+class _Ewm:
+    """Exponentially weighted mean matching pandas ewm(span=..., adjust=False)."""
+
+    def __init__(self, span):
+        self.alpha = 2.0 / (span + 1)
+        self.value = None
+
+    def update(self, x):
+        if self.value is None:
+            self.value = x
+        else:
+            self.value = (1 - self.alpha) * self.value + self.alpha * x
+        return self.value
+
+
+class StreamingFeatureEngineer:
+    """
+    Incremental version of FeatureEngineer for continuously appended bars.
+
+    Every indicator keeps O(1) state (ring-buffer sums for RSI and the moving
+    averages, running EWMs for MACD and its signal line, a Welford rolling
+    variance for Volatility), so each new bar costs the same regardless of
+    history length. Rows are emitted once all features are defined, matching
+    what FeatureEngineer.prepare_data keeps after dropna. Bars must arrive in
+    date order without missing values.
+    """
+
+    def __init__(self, rsi_window=14, macd_fast=12, macd_slow=26, macd_signal=9,
+                 ma_windows=[20, 50, 200], vol_window=20, lags=[1, 2, 3, 5], col='Close'):
+        self.col = col
+        self.ma_windows = list(ma_windows)
+        self.lags = list(lags)
+        self._gain = _RollingMean(rsi_window)
+        self._loss = _RollingMean(rsi_window)
+        self._ema_fast = _Ewm(macd_fast)
+        self._ema_slow = _Ewm(macd_slow)
+        self._signal = _Ewm(macd_signal)
+        self._mas = [_RollingMean(w) for w in self.ma_windows]
+        self._vol = _RollingStd(vol_window)
+        self._history = deque(maxlen=max(self.lags) + 1)
+        self._prev = None
+
+    def _update_one(self, bar):
+        price = float(bar[self.col])
+        row = dict(bar)
+        if 'Date' in row:
+            row['Date'] = pd.Timestamp(row['Date'])
+
+        # RSI: the first bar has no delta and counts as zero gain and loss
+        delta = 0.0 if self._prev is None else price - self._prev
+        gain = self._gain.update(delta if delta > 0 else 0.0)
+        loss = self._loss.update(-delta if delta < 0 else 0.0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rs = np.float64(gain) / np.float64(loss)
+        row['RSI'] = 100 - (100 / (1 + rs))
+
+        macd = self._ema_fast.update(price) - self._ema_slow.update(price)
+        row['MACD'] = macd
+        row['Signal_Line'] = self._signal.update(macd)
+
+        for w, ma in zip(self.ma_windows, self._mas):
+            row[f'MA_{w}'] = ma.update(price)
+
+        if self._prev is None:
+            row['Daily_Return'] = np.nan
+            row['Volatility'] = np.nan
+        else:
+            daily_return = price / self._prev - 1
+            row['Daily_Return'] = daily_return
+            row['Volatility'] = self._vol.update(daily_return)
+
+        self._history.append(price)
+        for lag in self.lags:
+            row[f'Lag_{lag}'] = self._history[-1 - lag] if len(self._history) > lag else np.nan
+
+        self._prev = price
+        return row
+
+    def update(self, bars):
+        """
+        Consumes one bar (dict or Series) or a small batch (DataFrame) and
+        returns a DataFrame holding only the newly completed feature rows.
+        """
+        if isinstance(bars, pd.DataFrame):
+            if 'Date' in bars.columns:
+                bars = bars.sort_values('Date')
+            records = bars.to_dict('records')
+        else:
+            records = [dict(bars)]
+
+        rows = []
+        for bar in records:
+            row = self._update_one(bar)
+            if not any(pd.isna(v) for v in row.values()):
+                rows.append(row)
+        return pd.DataFrame(rows)
@@ -0,0 +1,187 @@
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+import numpy as np
+
+from src import instrumentation
+from src.feature_engineering import FEATURE_LOOKBACK, MIN_FEATURE_BARS, latest_feature_rows
+from src.models import inverse_transform_column
+
+class InferenceService:
+    """
+    Scores the latest bar of many tickers against models in the registry.
+
+    Requests are queued and a background thread drains them in micro-batches
+    (up to max_batch_size tickers, waiting at most max_wait_ms for a batch to
+    fill), so concurrent callers share one feature computation: the trailing
+    features of every ticker in the batch come from one latest_feature_rows
+    call over the last `lookback` bars. Rows using the same model are then
+    scaled and predicted together. Fitted models are kept in memory (up to
+    max_models) and the newest registry entry per ticker is picked up as soon
+    as it is saved. Per-batch latencies are recorded for metrics().
+    """
+
+    def __init__(self, registry, max_batch_size=256, max_wait_ms=2.0, lookback=FEATURE_LOOKBACK,
+                 max_models=1024, history=1000):
+        self.registry = registry
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.lookback = lookback
+        self.max_models = max_models
+        self._models = {}
+        self._queue = queue.Queue()
+        self._batches = deque(maxlen=history)
+        self._stats_lock = threading.Lock()
+        self._worker = None
+        self._worker_lock = threading.Lock()
+
+    def submit(self, ticker, bars, model_name='XGBoost'):
+        """
+        Queues one ticker for scoring and returns a Future resolving to a dict
+        with the prediction (or an 'error') and the metrics of its batch.
+        bars: DataFrame or dict of column -> array, oldest first.
+        """
+        with self._worker_lock:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name='inference-batcher', daemon=True)
+                self._worker.start()
+        future = Future()
+        self._queue.put((ticker.upper(), bars, model_name, future, time.perf_counter()))
+        return future
+
+    def score(self, bars_by_ticker, model_name='XGBoost'):
+        """Blocking convenience wrapper: {ticker: result} for {ticker: bars}."""
+        futures = {t: self.submit(t, bars, model_name) for t, bars in bars_by_ticker.items()}
+        return {t: f.result() for t, f in futures.items()}
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.perf_counter() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - time.perf_counter()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=timeout))
+                except queue.Empty:
+                    break
+            try:
+                self._score_batch(batch)
+            except Exception as e:
+                for *_, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+
+    def _model_for(self, ticker, model_name):
+        key = self.registry.latest(ticker, model_name)
+        if key is None:
+            return None, None
+        entry = self._models.get(key)
+        instrumentation.cache_lookup('inference_models', hit=entry is not None)
+        if entry is None:
+            entry = self.registry.load(key)
+            if entry is None:
+                return None, None
+            if len(self._models) >= self.max_models:
+                self._models.pop(next(iter(self._models)))
+            self._models[key] = entry
+        return key, entry
+
+    @instrumentation.timed('inference.score_batch')
+    def _score_batch(self, batch):
+        started = time.perf_counter()
+        queue_ms = max((started - enqueued) * 1000 for *_, enqueued in batch)
+        results = [None] * len(batch)
+
+        # 1. Trailing features for the whole batch at once (per set of bar columns).
+        # A failure only fails the tickers of its own group (or model below),
+        # never the other requests sharing the batch.
+        by_columns = {}
+        for i, (_, bars, _, _, _) in enumerate(batch):
+            by_columns.setdefault(tuple(c for c in bars if c != 'Date'), {})[i] = bars
+        features = {}
+        for bars_by_row in by_columns.values():
+            try:
+                block = latest_feature_rows(bars_by_row, self.lookback, dtype=np.float64)
+            except Exception as e:
+                for i in bars_by_row:
+                    results[i] = {'error': f"Could not compute features: {e}"}
+                continue
+            for k, i in enumerate(bars_by_row):
+                features[i] = (block.values[k], block.columns, block.dates[k])
+        features_done = time.perf_counter()
+
+        # 2. Group rows by model so each model predicts once
+        groups = {}
+        for i, (ticker, _, model_name, _, _) in enumerate(batch):
+            if results[i] is not None:
+                continue
+            try:
+                key, entry = self._model_for(ticker, model_name)
+            except Exception as e:
+                results[i] = {'error': f"Could not load the {model_name} model for {ticker}: {e}"}
+                continue
+            if entry is None:
+                results[i] = {'error': f"No trained {model_name} model for {ticker}"}
+                continue
+            values, available, _ = features[i]
+            columns = entry['meta'].get('feature_columns')
+            if columns is None or any(c not in available for c in columns):
+                results[i] = {'error': f"Bars for {ticker} do not provide the model's features {columns}"}
+                continue
+            row = values[[available.index(c) for c in columns]]
+            if np.isnan(row).any():
+                results[i] = {'error': f"Not enough bars for {ticker}: at least {MIN_FEATURE_BARS} are needed"}
+                continue
+            groups.setdefault(key, (entry, columns, []))[2].append((i, row))
+
+        for key, (entry, columns, rows) in groups.items():
+            try:
+                scaler = entry['scalers']['feature_scaler']
+                target_idx = columns.index(entry['meta'].get('target_col', 'Close'))
+                X = np.vstack([row for _, row in rows]) * scaler.scale_ + scaler.min_
+                preds = inverse_transform_column(scaler, entry['model'].predict(X.astype(np.float32)), target_idx)
+            except Exception as e:
+                for i, _ in rows:
+                    results[i] = {'error': f"Scoring with model {key} failed: {e}"}
+                continue
+            for (i, _), pred in zip(rows, preds):
+                results[i] = {'prediction': float(pred), 'horizon': entry['meta'].get('horizon', 0), 'model_key': key}
+        finished = time.perf_counter()
+
+        metrics = {
+            'batch_size': len(batch),
+            'queue_ms': queue_ms,
+            'features_ms': (features_done - started) * 1000,
+            'predict_ms': (finished - features_done) * 1000,
+            'total_ms': (finished - started) * 1000,
+        }
+        with self._stats_lock:
+            self._batches.append(metrics)
+        for i, (ticker, _, model_name, future, _) in enumerate(batch):
+            result = {'ticker': ticker, 'model': model_name, **results[i], 'batch': metrics}
+            if 'prediction' in result and features[i][2] is not None:
+                result['as_of'] = str(np.datetime64(features[i][2], 'D'))
+            future.set_result(result)
+
+    def metrics(self):
+        """Latency summary over the recent batches (milliseconds)."""
+        with self._stats_lock:
+            batches = list(self._batches)
+        if not batches:
+            return {'batches': 0, 'tickers': 0}
+        total = np.array([b['total_ms'] for b in batches])
+        sizes = np.array([b['batch_size'] for b in batches])
+        return {
+            'batches': len(batches),
+            'tickers': int(sizes.sum()),
+            'mean_batch_size': float(sizes.mean()),
+            'batch_ms_p50': float(np.percentile(total, 50)),
+            'batch_ms_p99': float(np.percentile(total, 99)),
+            'per_ticker_ms_mean': float(total.sum() / sizes.sum()),
+            'queue_ms_p99': float(np.percentile([b['queue_ms'] for b in batches], 99)),
+        }
@@ -0,0 +1,242 @@
+"""
+Lightweight timers, counters and an opt-in sampling profiler.
+
+Stage timings are Prometheus histograms (so p99 latencies can be computed
+from /metrics) and cache lookups are counters. Everything is off unless
+enable() is called or STOCK_INSTRUMENTATION=1; disabled, a timer costs one
+flag check and counters return at once.
+
+    from src import instrumentation
+
+    @instrumentation.timed('features.prepare_matrix')
+    def prepare_matrix(...): ...
+
+    with instrumentation.timer('registry.load'):
+        ...
+
+    instrumentation.cache_lookup('response', hit=True)
+
+Setting PROFILE_DIR (or calling enable_profiling(dir)) additionally samples
+the stack of the thread inside each profile(name) block and writes the
+samples as folded stacks (<dir>/<name>-<timestamp>.folded), the input format
+of flamegraph.pl and speedscope.
+"""
+import functools
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+# Histogram bucket upper bounds, in seconds
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+enabled = os.environ.get('STOCK_INSTRUMENTATION', '0') == '1'
+profile_dir = os.environ.get('PROFILE_DIR') or None
+
+_lock = threading.Lock()
+_histograms = {} # (metric, labels) -> [bucket counts..., +Inf count, sum]
+_counters = Counter() # (metric, labels) -> value
+
+# Type and help text of the metrics recorded by this project
+METRICS_HELP = {
+    'stock_stage_seconds': ('histogram', 'Duration of pipeline stages.'),
+    'stock_request_seconds': ('histogram', 'Duration of API requests.'),
+    'stock_cache_requests_total': ('counter', 'Cache lookups by cache and result.'),
+}
+
+def enable():
+    global enabled
+    enabled = True
+
+def disable():
+    global enabled
+    enabled = False
+
+def enable_profiling(directory):
+    """Writes one folded-stack profile per profile() block to `directory` (None turns it off)."""
+    global profile_dir
+    profile_dir = directory
+
+def reset():
+    """Drops every recorded metric."""
+    with _lock:
+        _histograms.clear()
+        _counters.clear()
+
+def _labels(labels):
+    return tuple(sorted(labels.items()))
+
+def observe(metric, seconds, **labels):
+    """Records one duration in the histogram `metric`."""
+    if not enabled:
+        return
+    key = (metric, _labels(labels))
+    with _lock:
+        values = _histograms.get(key)
+        if values is None:
+            values = _histograms[key] = [0] * (len(BUCKETS) + 1) + [0.0]
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                values[i] += 1
+                break
+        else:
+            values[len(BUCKETS)] += 1
+        values[-1] += seconds
+
+def increment(metric, amount=1, **labels):
+    """Adds `amount` to the counter `metric`."""
+    if not enabled:
+        return
+    with _lock:
+        _counters[(metric, _labels(labels))] += amount
+
+def cache_lookup(cache, hit):
+    """Counts one lookup in the named cache as a hit or a miss."""
+    if enabled:
+        increment('stock_cache_requests_total', cache=cache, result='hit' if hit else 'miss')
+
+class _NoopTimer:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_NOOP = _NoopTimer()
+
+class _Timer:
+    __slots__ = ('stage', 'start')
+
+    def __init__(self, stage):
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        observe('stock_stage_seconds', time.perf_counter() - self.start, stage=self.stage)
+        return False
+
+def timer(stage):
+    """Context manager recording the duration of a block under stock_stage_seconds{stage=...}."""
+    return _Timer(stage) if enabled else _NOOP
+
+def timed(stage):
+    """Decorator form of timer()."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not enabled:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                observe('stock_stage_seconds', time.perf_counter() - start, stage=stage)
+        return wrapper
+    return decorator
+
+def _format_labels(labels, extra=()):
+    items = list(labels) + list(extra)
+    if not items:
+        return ''
+    escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, v in items)
+    return '{' + ','.join(f'{k}="{v}"' for (k, _), v in zip(items, escaped)) + '}'
+
+def render_prometheus():
+    """All metrics in the Prometheus text exposition format (version 0.0.4)."""
+    with _lock:
+        histograms = {key: list(values) for key, values in _histograms.items()}
+        counters = dict(_counters)
+    lines = []
+    described = set()
+
+    def describe(metric, default_type):
+        if metric not in described:
+            described.add(metric)
+            kind, text = METRICS_HELP.get(metric, (default_type, metric))
+            lines.append(f"# HELP {metric} {text}")
+            lines.append(f"# TYPE {metric} {kind}")
+
+    for (metric, labels), values in sorted(histograms.items()):
+        describe(metric, 'histogram')
+        cumulative = 0
+        for bound, count in zip(BUCKETS, values):
+            cumulative += count
+            lines.append(f"{metric}_bucket{_format_labels(labels, [('le', repr(bound))])} {cumulative}")
+        cumulative += values[len(BUCKETS)]
+        lines.append(f"{metric}_bucket{_format_labels(labels, [('le', '+Inf')])} {cumulative}")
+        lines.append(f"{metric}_sum{_format_labels(labels)} {values[-1]}")
+        lines.append(f"{metric}_count{_format_labels(labels)} {cumulative}")
+    for (metric, labels), value in sorted(counters.items()):
+        describe(metric, 'counter')
+        lines.append(f"{metric}{_format_labels(labels)} {value}")
+    return '\n'.join(lines) + '\n'
+
+class SamplingProfiler:
+    """
+    Samples the Python stack of one thread every `interval` seconds from a
+    background thread (sys._current_frames), counting identical stacks.
+    Nothing is traced, so the profiled code runs at full speed apart from
+    the GIL handoffs of the sampler.
+    """
+
+    def __init__(self, thread_id=None, interval=0.005):
+        self.thread_id = thread_id or threading.get_ident()
+        self.interval = interval
+        self.samples = Counter()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                frame = frame.f_back
+            if stack:
+                self.samples[';'.join(reversed(stack))] += 1
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='sampling-profiler', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        return self
+
+    def folded(self):
+        """The samples as folded stacks: 'outer;...;inner count' per line."""
+        return ''.join(f"{stack} {count}\n" for stack, count in self.samples.most_common())
+
+    def write(self, path):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, 'w') as f:
+            f.write(self.folded())
+        return path
+
+class _Profile:
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.profiler = SamplingProfiler().start()
+        return self.profiler
+
+    def __exit__(self, *exc):
+        self.profiler.stop()
+        safe_name = ''.join(c if c.isalnum() or c in '-_.' else '_' for c in self.name)
+        path = os.path.join(profile_dir, f"{safe_name}-{time.strftime('%Y%m%dT%H%M%S')}-{time.time_ns() % 10**9:09d}.folded")
+        self.profiler.write(path)
+        print(f"Profile written to {path}")
+        return False
+
+def profile(name):
+    """Samples the current thread for the duration of the block when profiling is on."""
+    return _Profile(name) if profile_dir else _NOOP
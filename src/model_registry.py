@@ -0,0 +1,185 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from src import instrumentation
+
+try:
+    import fcntl
+except ImportError:  # Windows: the index is merged before writing, without a file lock
+    fcntl = None
+
+class ModelRegistry:
+    """
+    Persistent store for fitted models and their scalers.
+
+    Entries are keyed on ticker, date range, feature columns, model name and
+    hyperparameters, so a warm model is only reused when all of them match.
+    Recently used entries are also kept in memory. Both the in-memory layer and
+    the on-disk store are capped and evict the least recently used entry.
+
+    Hits only update last_used in memory; the index is persisted when an
+    entry is saved. Several processes (API workers) can share a registry
+    directory: before writing, the on-disk index is re-read under a file lock
+    and merged with this process's view, so each worker's saves and use
+    times count towards one LRU order and one max_entries cap.
+    """
+
+    def __init__(self, registry_dir='models', max_entries=50, max_memory_entries=8):
+        self.registry_dir = registry_dir
+        self.max_entries = max_entries
+        self.max_memory_entries = max_memory_entries
+        self.index_path = os.path.join(self.registry_dir, 'index.json')
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        os.makedirs(self.registry_dir, exist_ok=True)
+        self._index_mtime = None
+        self._index = self._read_index()
+
+    @staticmethod
+    def make_key(ticker, start_date, end_date, feature_columns, model_name, params, feature_dtype='float64',
+                 horizon=None):
+        """Builds a stable key from everything that affects the fitted model."""
+        payload = json.dumps({
+            'ticker': ticker.upper(),
+            'start_date': str(start_date),
+            'end_date': str(end_date),
+            'features': list(feature_columns),
+            'dtype': str(feature_dtype),
+            'model': model_name,
+            'params': params,
+            'horizon': horizon, # Rows ahead of the target (None: same-row split_data target)
+        }, sort_keys=True, default=str)
+        return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+    def _entry_path(self, key):
+        return os.path.join(self.registry_dir, f"{key}.joblib")
+
+    def _index_changed(self):
+        """True when another process rewrote the index since this one last read or wrote it."""
+        try:
+            return os.stat(self.index_path).st_mtime_ns != self._index_mtime
+        except FileNotFoundError:
+            return False
+
+    def _read_index(self):
+        if os.path.exists(self.index_path):
+            try:
+                self._index_mtime = os.stat(self.index_path).st_mtime_ns
+                with open(self.index_path) as f:
+                    return json.load(f)
+            except (OSError, ValueError):
+                print(f"Model registry index at {self.index_path} is unreadable, starting empty.")
+        return {}
+
+    def _write_index(self):
+        tmp_path = f"{self.index_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self._index, f, indent=2)
+        os.replace(tmp_path, self.index_path)
+        self._index_mtime = os.stat(self.index_path).st_mtime_ns
+
+    @contextmanager
+    def _index_lock(self):
+        """Exclusive lock on the index file across processes (a no-op without fcntl)."""
+        if fcntl is None:
+            yield
+            return
+        with open(self.index_path + '.lock', 'a') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _merge_index(self):
+        """
+        Merges the on-disk index into this process's: entries saved by other
+        processes are added, the latest last_used wins, and entries whose file
+        is gone (evicted elsewhere) are dropped. Call under _index_lock.
+        """
+        merged = self._read_index()
+        for key, record in self._index.items():
+            if key in merged:
+                merged[key]['last_used'] = max(merged[key].get('last_used', 0), record.get('last_used', 0))
+            else:
+                merged[key] = record
+        self._index = {key: record for key, record in merged.items() if os.path.exists(self._entry_path(key))}
+        for key in list(self._memory):
+            if key not in self._index:
+                self._memory.pop(key)
+
+    def _remember(self, key, entry):
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def _evict(self):
+        """Drops least recently used entries until the on-disk cap is met."""
+        while len(self._index) > self.max_entries:
+            oldest = min(self._index, key=lambda k: self._index[k]['last_used'])
+            self._index.pop(oldest)
+            self._memory.pop(oldest, None)
+            try:
+                os.remove(self._entry_path(oldest))
+            except FileNotFoundError:
+                pass
+            print(f"Evicted model {oldest} from registry")
+
+    def load(self, key):
+        """Returns the stored entry (model, scalers, meta) or None on a miss."""
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is None:
+                path = self._entry_path(key)
+                if key not in self._index and os.path.exists(path) and self._index_changed():
+                    # Saved by another process since this one last read the index
+                    with self._index_lock():
+                        self._merge_index()
+                if key not in self._index or not os.path.exists(path):
+                    self._index.pop(key, None)
+                    instrumentation.cache_lookup('model_registry', hit=False)
+                    return None
+                import joblib
+                entry = joblib.load(path)
+            instrumentation.cache_lookup('model_registry', hit=True)
+            self._remember(key, entry)
+            self._index[key]['last_used'] = time.time() # Persisted with the next save
+            return entry
+
+    def latest(self, ticker, model_name):
+        """
+        Key of the most recent model for a ticker: the one trained up to the
+        latest end date, then the most recently saved. None if there is none.
+        """
+        ticker = ticker.upper()
+        with self._lock:
+            if self._index_changed():
+                with self._index_lock():
+                    self._merge_index()
+            candidates = [(record.get('end_date', ''), record.get('saved_at', 0), key)
+                          for key, record in self._index.items()
+                          if record.get('ticker') == ticker and record.get('model') == model_name]
+        return max(candidates)[2] if candidates else None
+
+    def save(self, key, model, scalers, meta=None):
+        """Persists a fitted model together with the scalers it was trained with."""
+        entry = {'model': model, 'scalers': dict(scalers), 'meta': meta or {}}
+        with self._lock:
+            import joblib
+            path = self._entry_path(key)
+            joblib.dump(entry, path)
+            record = dict(meta or {})
+            record['last_used'] = record['saved_at'] = time.time()
+            record['size_bytes'] = os.path.getsize(path)
+            with self._index_lock():
+                self._merge_index()
+                self._index[key] = record
+                self._remember(key, entry)
+                self._evict()
+                self._write_index()
+        return key
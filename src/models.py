@@ -1,19 +1,170 @@
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import get_context
+from multiprocessing.shared_memory import SharedMemory
 import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
 import pandas as pd
-from sklearn.model_selection import train_test_split
-from sklearn.preprocessing import MinMaxScaler, StandardScaler
-from sklearn.linear_model import LinearRegression
-from sklearn.ensemble import RandomForestRegressor
-from xgboost import XGBRegressor
-from sklearn.metrics import mean_squared_error, mean_absolute_error
+from src import instrumentation
+from src.feature_engineering import FeatureMatrix
+# sklearn, xgboost and tensorflow are imported lazily where each model is
+# built, so importing this module (e.g. from the API) stays fast.
 # import tensorflow as tf
 # from tensorflow.keras.models import Sequential
 # from tensorflow.keras.layers import LSTM, Dense, Bidirectional, Attention, Layer, Input
 # from tensorflow.keras.optimizers import Adam
 
+# Default hyperparameters. Kept at module level so cached models can be keyed on them.
+RANDOM_FOREST_PARAMS = {'n_estimators': 100, 'random_state': 42}
+XGBOOST_PARAMS = {'n_estimators': 100, 'learning_rate': 0.05, 'random_state': 42}
+# How XGBoost fits several horizons in one model: 'one_output_per_tree' (a tree
+# per horizon each round, on one shared quantized matrix) or
+# 'multi_output_tree' (one tree per round with a leaf vector over the horizons;
+# slower to grow on CPU, about 2x three single fits in our runs)
+XGBOOST_MULTI_STRATEGY = 'one_output_per_tree'
+
+# Model name -> ModelTrainer method, in rough order of training cost (slowest first)
+TRAIN_METHODS = {
+    'BiLSTM': 'train_bi_lstm',
+    'LSTM': 'train_lstm',
+    'RandomForest': 'train_random_forest',
+    'XGBoost': 'train_xgboost',
+    'LinearRegression': 'train_linear_regression',
+}
+KERAS_MODELS = ('LSTM', 'BiLSTM')
+
+# Fast LSTM/BiLSTM training (ModelTrainer.fast_deep): adaptive batch size
+# aiming at ~target_steps steps per epoch, early stopping on a validation
+# tail of the training windows, and XLA-compiled train steps
+DEEP_TRAINING = {
+    'max_epochs': 50,
+    'patience': 3,
+    'validation_size': 0.1,
+    'min_batch_size': 32,
+    'max_batch_size': 512,
+    'target_steps': 50,
+    'jit_compile': True,
+}
+
+# Compiled Keras models reused across trainers in this process, keyed on
+# (model name, seq_length, n_features, n_outputs, jit_compile) ->
+# (model, initial weights, initial optimizer state)
+_compiled_deep_models = {}
+
+def inverse_transform_column(scaler, values, idx):
+    """Inverts a fitted MinMaxScaler for a single column without building a full-width matrix."""
+    return (np.asarray(values) - scaler.min_[idx]) / scaler.scale_[idx]
+
+def _share_array(arr):
+    """Copies an array into a new shared memory block and returns (block, spec)."""
+    arr = np.ascontiguousarray(arr)
+    shm = SharedMemory(create=True, size=max(arr.nbytes, 1))
+    np.ndarray(arr.shape, dtype=arr.dtype, buffer=shm.buf)[...] = arr
+    return shm, (shm.name, arr.shape, arr.dtype.str)
+
+def _attach_array(spec):
+    """Maps a shared block created by _share_array without copying it."""
+    name, shape, dtype = spec
+    # Spawned workers share the parent's resource tracker, which unlinks the block once
+    shm = SharedMemory(name=name)
+    return shm, np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf)
+
+def _adaptive_batch_size(n_samples):
+    """Largest power of two giving about DEEP_TRAINING['target_steps'] steps per epoch, within bounds."""
+    per_step = max(n_samples // DEEP_TRAINING['target_steps'], 1)
+    size = 2 ** int(np.log2(per_step))
+    return int(np.clip(size, DEEP_TRAINING['min_batch_size'], DEEP_TRAINING['max_batch_size']))
+
+def _window_dataset(X, y, seq_length, starts, batch_size, shuffle=False, seed=42, target_offset=None):
+    """
+    tf.data pipeline of (X[i:i+seq_length], y[i+target_offset]) batches for
+    the window starts `starts` (target_offset defaults to seq_length, the row
+    after the window). Windows are gathered per batch from the 2-D array, so
+    the full set of windows is never materialized.
+    """
+    import tensorflow as tf
+    X_t = tf.constant(X, dtype=tf.float32)
+    y_t = tf.constant(y[seq_length if target_offset is None else target_offset:], dtype=tf.float32)
+    offsets = tf.range(seq_length, dtype=tf.int64)
+    ds = tf.data.Dataset.from_tensor_slices(np.asarray(starts, dtype=np.int64))
+    if shuffle:
+        ds = ds.shuffle(len(starts), seed=seed, reshuffle_each_iteration=True)
+    ds = ds.batch(batch_size)
+    ds = ds.map(lambda idx: (tf.gather(X_t, idx[:, None] + offsets), tf.gather(y_t, idx)),
+                num_parallel_calls=tf.data.AUTOTUNE)
+    return ds.prefetch(tf.data.AUTOTUNE)
+
+def _optimizer_variables(optimizer):
+    variables = optimizer.variables
+    return variables() if callable(variables) else variables # A method in older Keras
+
+def _compiled_deep_model(model_name, seq_length, n_features, jit_compile, n_outputs=1):
+    """
+    Returns (model, initial weights, initial optimizer state), building and
+    compiling the model once per process.
+    """
+    key = (model_name, seq_length, n_features, n_outputs, jit_compile)
+    if key not in _compiled_deep_models:
+        from tensorflow.keras.models import Sequential
+        from tensorflow.keras.layers import LSTM, Dense, Bidirectional, Input
+        wrap = Bidirectional if model_name == 'BiLSTM' else (lambda layer: layer)
+        model = Sequential([
+            Input(shape=(seq_length, n_features)),
+            wrap(LSTM(50, return_sequences=True)),
+            wrap(LSTM(50, return_sequences=False)),
+            Dense(25),
+            Dense(n_outputs), # One output per horizon
+        ])
+        model.compile(optimizer='adam', loss='mean_squared_error', jit_compile=jit_compile)
+        # Build the Adam slots now so their zero state (and step 0) can be restored
+        # (optimizer.build: Keras optimizers of TensorFlow 2.11+)
+        model.optimizer.build(model.trainable_variables)
+        optimizer_state = [v.numpy() for v in _optimizer_variables(model.optimizer)]
+        _compiled_deep_models[key] = (model, model.get_weights(), optimizer_state)
+    return _compiled_deep_models[key]
+
+def _limit_threads(n_threads):
+    """Caps native thread pools so parallel workers do not oversubscribe the CPU."""
+    for var in ('OMP_NUM_THREADS', 'MKL_NUM_THREADS', 'OPENBLAS_NUM_THREADS'):
+        os.environ[var] = str(n_threads)
+    from threadpoolctl import threadpool_limits
+    threadpool_limits(n_threads)
+
+def _train_worker(model_name, X_spec, y_spec, seq_length, n_threads, output_dir, fast_deep=False,
+                  aligned_targets=False):
+    """Trains one model in a worker process on the shared train arrays."""
+    _limit_threads(n_threads)
+    X_shm, X_train = _attach_array(X_spec)
+    y_shm, y_train = _attach_array(y_spec)
+    try:
+        trainer = ModelTrainer(None, seq_length=seq_length)
+        trainer.X_train, trainer.y_train = X_train, y_train
+        trainer.aligned_targets = aligned_targets
+        trainer.n_jobs = n_threads
+        trainer.fast_deep = fast_deep
+        if model_name in KERAS_MODELS:
+            import tensorflow as tf
+            try:
+                tf.config.threading.set_intra_op_parallelism_threads(n_threads)
+                tf.config.threading.set_inter_op_parallelism_threads(1)
+            except RuntimeError:
+                pass  # Runtime already initialised by an earlier model in this worker
+        model = getattr(trainer, TRAIN_METHODS[model_name])()
+        if model_name in KERAS_MODELS:
+            # Keras models are handed back through a file rather than pickled
+            path = os.path.join(output_dir, f"{model_name}.keras")
+            model.save(path)
+            return model_name, path
+        return model_name, model
+    finally:
+        del X_train, y_train
+        X_shm.close()
+        y_shm.close()
+
 class ModelTrainer:
     def __init__(self, data, target_col='Close', test_size=0.2, seq_length=60):
-        self.data = data
+        self.data = data # DataFrame of features, or a FeatureMatrix
         self.target_col = target_col
         self.test_size = test_size
         self.seq_length = seq_length
@@ -23,22 +174,49 @@ class ModelTrainer:
         self.y_train = None
         self.y_test = None
         self.models = {}
+        self.target_idx = None # Column of target_col in the scaled matrix, set by split_data
+        self.n_jobs = None # Threads for RF/XGBoost (None = library default)
+        self.fast_deep = False # Train LSTM/BiLSTM with the tf.data / early stopping mode
+        self.dataset = None # SupervisedDataset given to load_dataset
+        self.horizons = None # Rows ahead that the y columns refer to (None: same row, split_data)
+        # True when y[t] is already the target of feature row t (load_dataset),
+        # so LSTM windows end at t; with split_data they end at t-1
+        self.aligned_targets = False
 
-    def split_data(self):
-        """Splits data into train and test sets (Time-series split)."""
+    @instrumentation.timed('trainer.split_data')
+    def split_data(self, scaler=None):
+        """Splits data into train and test sets (Time-series split).
+
+        If a fitted scaler is given (e.g. one restored from the model registry)
+        it is reused instead of fitting a new one.
+
+        The target is target_col of the same row, which is also a feature. For
+        look-ahead-free t+h targets use load_dataset() with a
+        SupervisedDatasetBuilder instead.
+        """
         # Drop non-numeric columns like Date for training
-        if 'Date' in self.data.columns:
+        if isinstance(self.data, FeatureMatrix):
+            # Preassembled block from FeatureEngineer.prepare_matrix: used as is, no copy
+            self.dates = self.data.dates
+            data_numeric = self.data.values
+            columns = self.data.columns
+        elif 'Date' in self.data.columns:
             self.dates = self.data['Date']
             data_numeric = self.data.drop(['Date'], axis=1)
+            columns = list(data_numeric.columns)
         else:
             self.dates = self.data.index
             data_numeric = self.data
+            columns = list(data_numeric.columns)
             
         train_size = int(len(data_numeric) * (1 - self.test_size))
         
         # Scaling
-        scaler = MinMaxScaler()
-        data_scaled = scaler.fit_transform(data_numeric)
+        # Fit on the training rows only so test data does not leak into the scaling
+        if scaler is None:
+            from sklearn.preprocessing import MinMaxScaler
+            scaler = MinMaxScaler().fit(data_numeric[:train_size])
+        data_scaled = scaler.transform(data_numeric)
         self.scalers['feature_scaler'] = scaler
         
         # Create X and y
@@ -47,8 +225,9 @@ class ModelTrainer:
         # However, for fair comparison with LSTM (which uses sequence), 
         # ML models usually use lag features already generated in feature_engineering.
         
-        # Identify target index
-        target_idx = list(data_numeric.columns).index(self.target_col)
+        # Identify target index (cached for predict / get_actual_values)
+        target_idx = columns.index(self.target_col)
+        self.target_idx = target_idx
         
         X = data_scaled[:, :] # All features including current price 
         # But wait, if we predict *future* price, we should shift y.
@@ -81,17 +260,67 @@ class ModelTrainer:
         print(f"Data Split: Train shape {self.X_train.shape}, Test shape {self.X_test.shape}")
         return self.X_train, self.X_test, self.y_train, self.y_test
 
+    def load_dataset(self, dataset, horizon=None):
+        """
+        Takes the train/test arrays from a SupervisedDataset (src.dataset)
+        instead of split_data: y is target_col `horizon` rows after each
+        feature row. Every train_* method and predict() then work on these
+        arrays.
+
+        By default all of the dataset's horizons are kept: with several, y is
+        (rows, horizons) and every model is fitted once for all of them
+        (multi-output), and predict() returns one column per horizon.
+        """
+        horizons = dataset.horizons if horizon is None else (horizon,)
+        columns = [dataset.horizons.index(h) for h in horizons]
+        # A single horizon stays 1-D, as with split_data
+        k = columns[0] if len(columns) == 1 else slice(None)
+        self.dataset = dataset
+        self.horizons = horizons
+        self.aligned_targets = True
+        self.scalers['feature_scaler'] = dataset.scaler
+        self.target_col = dataset.columns[dataset.target_idx]
+        self.target_idx = dataset.target_idx
+        self.dates = dataset.test_dates
+        self.X_train, self.X_test = dataset.X_train, dataset.X_test
+        self.y_train, self.y_test = dataset.Y_train[:, k], dataset.Y_test[:, k]
+        print(f"Data Split (t+{', t+'.join(map(str, horizons))}): "
+              f"Train shape {self.X_train.shape}, Test shape {self.X_test.shape}")
+        return self.X_train, self.X_test, self.y_train, self.y_test
+
+    @property
+    def n_outputs(self):
+        """Targets fitted at once: the number of horizons in a multi-output y_train."""
+        return 1 if np.ndim(self.y_train) == 1 else np.shape(self.y_train)[1]
+
+    @property
+    def window_target_offset(self):
+        """Index in y of the target of the first LSTM window X[0:seq_length]."""
+        return self.seq_length - 1 if self.aligned_targets else self.seq_length
+
     def prepare_lstm_data(self, X_data, y_data):
-        """Reshapes data for LSTM [samples, time steps, features]."""
-        X_seq, y_seq = [], []
-        # Create sequences
-        for i in range(self.seq_length, len(X_data)):
-            X_seq.append(X_data[i-self.seq_length:i])
-            y_seq.append(y_data[i])
-        return np.array(X_seq), np.array(y_seq)
+        """
+        Reshapes data for LSTM [samples, time steps, features].
+
+        Sample i is the window X_data[i:i+seq_length] paired with
+        y_data[i+window_target_offset]: the row after the window with
+        split_data, the window's last row when the targets are already shifted.
+        The windows are a read-only strided view over X_data, so no data is copied.
+        """
+        X_data = np.asarray(X_data)
+        y_data = np.asarray(y_data)
+        offset = self.window_target_offset
+        n_samples = max(len(X_data) - offset, 0)
+        if n_samples == 0:
+            return np.empty((0, self.seq_length, X_data.shape[1]), dtype=X_data.dtype), y_data[:0]
+        # Windows come out as (n, n_features, seq_length); move time before features
+        windows = sliding_window_view(X_data, self.seq_length, axis=0)[:n_samples]
+        return windows.transpose(0, 2, 1), y_data[offset:]
 
+    @instrumentation.timed('trainer.train_linear_regression')
     def train_linear_regression(self):
         print("Training Linear Regression...")
+        from sklearn.linear_model import LinearRegression
         model = LinearRegression()
         # For ML models, we ignore the sequence structure and treat rows as independent samples
         # effectively using lags as temporal features.
@@ -99,22 +328,95 @@ class ModelTrainer:
         self.models['LinearRegression'] = model
         return model
 
-    def train_random_forest(self):
+    @instrumentation.timed('trainer.train_random_forest')
+    def train_random_forest(self, params=None):
+        """params override RANDOM_FOREST_PARAMS (e.g. tuned ones from src.tuning)."""
         print("Training Random Forest...")
-        model = RandomForestRegressor(n_estimators=100, random_state=42)
-        # RF doesn't handle time series natively, but works with lag features
+        from sklearn.ensemble import RandomForestRegressor
+        model = RandomForestRegressor(**{**RANDOM_FOREST_PARAMS, **(params or {})}, n_jobs=self.n_jobs)
+        # RF doesn't handle time series natively, but works with lag features.
+        # A 2-D y grows one forest whose leaves hold every horizon.
         model.fit(self.X_train, self.y_train)
         self.models['RandomForest'] = model
         return model
 
-    def train_xgboost(self):
+    @instrumentation.timed('trainer.train_xgboost')
+    def train_xgboost(self, params=None):
+        """params override XGBOOST_PARAMS (e.g. tuned ones from src.tuning)."""
         print("Training XGBoost...")
-        model = XGBRegressor(n_estimators=100, learning_rate=0.05, random_state=42)
+        from xgboost import XGBRegressor
+        params = {**XGBOOST_PARAMS, **(params or {})}
+        if self.n_outputs > 1:
+            # All horizons in one fit; params may pick multi_strategy='multi_output_tree'
+            params = {'tree_method': 'hist', 'multi_strategy': XGBOOST_MULTI_STRATEGY, **params}
+        model = XGBRegressor(**params, n_jobs=self.n_jobs)
         model.fit(self.X_train, self.y_train)
         self.models['XGBoost'] = model
         return model
 
+    @instrumentation.timed('trainer.train_deep_fast')
+    def train_deep_fast(self, model_name, warm_start=False):
+        """
+        CPU-optimized LSTM/BiLSTM training.
+
+        Windows are streamed from the 2-D training array through a prefetching
+        tf.data pipeline, the batch size grows with the data, and training
+        stops once the loss on the last DEEP_TRAINING['validation_size'] of
+        the windows stops improving (keeping the best weights). The compiled
+        model is kept per process and re-fitted on later calls instead of
+        being rebuilt: from its initial weights and a fresh optimizer state
+        (Adam moments and step count), or from its current ones with
+        warm_start. Trainers of the same shape share that compiled model, so
+        they must not train concurrently; each trainer keeps an uncompiled
+        clone holding its own fitted weights, which later fits do not touch.
+        """
+        import tensorflow as tf
+        X = np.asarray(self.X_train, dtype=np.float32)
+        y = np.asarray(self.y_train, dtype=np.float32)
+        offset = self.window_target_offset
+        n_samples = len(X) - offset
+        if n_samples < 2:
+            raise ValueError(f"Need more than {self.seq_length + 1} training rows for {model_name}.")
+        n_val = max(1, int(n_samples * DEEP_TRAINING['validation_size']))
+        starts = np.arange(n_samples)
+        batch_size = _adaptive_batch_size(n_samples - n_val)
+        train_ds = _window_dataset(X, y, self.seq_length, starts[:-n_val], batch_size, shuffle=True,
+                                   target_offset=offset)
+        val_ds = _window_dataset(X, y, self.seq_length, starts[-n_val:], batch_size, target_offset=offset)
+        print(f"Training {model_name} (fast mode, batch size {batch_size}, up to {DEEP_TRAINING['max_epochs']} epochs)...")
+
+        def fit(jit_compile):
+            model, initial_weights, optimizer_state = _compiled_deep_model(
+                model_name, self.seq_length, X.shape[1], jit_compile, self.n_outputs)
+            if not warm_start:
+                model.set_weights(initial_weights)
+                for variable, value in zip(_optimizer_variables(model.optimizer), optimizer_state):
+                    variable.assign(value)
+            stop = tf.keras.callbacks.EarlyStopping(monitor='val_loss', patience=DEEP_TRAINING['patience'],
+                                                    restore_best_weights=True)
+            model.fit(train_ds, validation_data=val_ds, epochs=DEEP_TRAINING['max_epochs'],
+                      callbacks=[stop], verbose=2)
+            return model
+
+        xla_errors = (tf.errors.InvalidArgumentError, tf.errors.UnimplementedError, tf.errors.InternalError)
+        try:
+            model = fit(DEEP_TRAINING['jit_compile'])
+        except xla_errors as e:
+            # Some TensorFlow builds cannot XLA-compile the recurrent loop on CPU;
+            # anything else (or a failure without XLA) is a real error
+            if not DEEP_TRAINING['jit_compile'] or 'xla' not in str(e).lower():
+                raise
+            print(f"XLA compilation failed ({e.__class__.__name__}), retrying in graph mode")
+            model = fit(False)
+        fitted = tf.keras.models.clone_model(model)
+        fitted.set_weights(model.get_weights())
+        self.models[model_name] = fitted
+        return fitted
+
+    @instrumentation.timed('trainer.train_lstm')
     def train_lstm(self):
+        if self.fast_deep:
+            return self.train_deep_fast('LSTM')
         print("Training LSTM...")
         # Lazy import tensorflow
         import tensorflow as tf
@@ -129,14 +431,17 @@ class ModelTrainer:
         model.add(LSTM(50, return_sequences=True))
         model.add(LSTM(50, return_sequences=False))
         model.add(Dense(25))
-        model.add(Dense(1))
+        model.add(Dense(self.n_outputs)) # One output per horizon
         
         model.compile(optimizer='adam', loss='mean_squared_error')
         model.fit(X_train_seq, y_train_seq, batch_size=32, epochs=5, verbose=1) # Low epochs for demo
         self.models['LSTM'] = model
         return model
 
+    @instrumentation.timed('trainer.train_bi_lstm')
     def train_bi_lstm(self):
+        if self.fast_deep:
+            return self.train_deep_fast('BiLSTM')
         print("Training Bi-LSTM...")
         import tensorflow as tf
         from tensorflow.keras.models import Sequential
@@ -149,62 +454,82 @@ class ModelTrainer:
         model.add(Bidirectional(LSTM(50, return_sequences=True)))
         model.add(Bidirectional(LSTM(50, return_sequences=False)))
         model.add(Dense(25))
-        model.add(Dense(1))
+        model.add(Dense(self.n_outputs)) # One output per horizon
         
         model.compile(optimizer='adam', loss='mean_squared_error')
         model.fit(X_train_seq, y_train_seq, batch_size=32, epochs=5, verbose=1)
         self.models['BiLSTM'] = model
         return model
 
+    def train_models_parallel(self, model_names, n_jobs=None, on_trained=None):
+        """
+        Trains several models at once in a pool of worker processes.
+
+        The scaled train arrays are placed in shared memory once and mapped by
+        every worker instead of being pickled per task. Each worker's native
+        thread pools are capped at cpu_count // n_jobs to avoid oversubscription.
+        on_trained(name) is called as each model arrives, while the rest train.
+        """
+        model_names = sorted(model_names, key=list(TRAIN_METHODS).index)
+        n_jobs = min(n_jobs or os.cpu_count(), len(model_names))
+        n_threads = max(1, (os.cpu_count() or 1) // n_jobs)
+        print(f"Training {len(model_names)} models with {n_jobs} workers ({n_threads} threads each)...")
+
+        X_shm, X_spec = _share_array(self.X_train)
+        y_shm, y_spec = _share_array(self.y_train)
+        try:
+            with tempfile.TemporaryDirectory() as output_dir, \
+                    ProcessPoolExecutor(n_jobs, mp_context=get_context('spawn')) as pool:
+                futures = {
+                    pool.submit(_train_worker, name, X_spec, y_spec, self.seq_length, n_threads, output_dir,
+                                self.fast_deep, self.aligned_targets): name
+                    for name in model_names
+                }
+                for future in as_completed(futures):
+                    name = futures[future]
+                    try:
+                        _, result = future.result()
+                    except Exception as e:
+                        print(f"Error training {name}: {e}")
+                        continue
+                    if name in KERAS_MODELS:
+                        import tensorflow as tf
+                        result = tf.keras.models.load_model(result)
+                    self.models[name] = result
+                    print(f"Finished training {name}")
+                    if on_trained is not None:
+                        on_trained(name)
+        finally:
+            for shm in (X_shm, y_shm):
+                shm.close()
+                shm.unlink()
+        return self.models
+
+    def inverse_transform_target(self, values):
+        """Maps scaled target values back to prices using the target column's scaling only."""
+        return inverse_transform_column(self.scalers['feature_scaler'], values, self.target_idx)
+
+    @instrumentation.timed('trainer.predict')
     def predict(self, model_name):
+        """Test-set predictions in price units; (rows, horizons) for a multi-horizon trainer."""
         model = self.models.get(model_name)
         if not model:
             raise ValueError(f"Model {model_name} not trained yet.")
         
         print(f"Predicting with {model_name}...")
         if model_name in ['LSTM', 'BiLSTM']:
+            # One prediction per window, lined up with y_test[window_target_offset:]
             X_test_seq, _ = self.prepare_lstm_data(self.X_test, self.y_test)
             preds = model.predict(X_test_seq)
-            # Inverse transform requires the scaler and the full shape roughly.
-            # We scaled all features. The predictions are just 'Close'.
-            # We need to construct a matrix of shape (n_samples, n_features) to inverse transform.
-            # Trick: copy X_test, replace target col with predictions, then inverse transform.
-            
-            # This is complex because X_test_seq is smaller than X_test by seq_length
-            dummy = np.zeros((len(preds), self.X_test.shape[1]))
-            # Copy other features from X_test (aligned by index)
-            # X_test_seq indices correspond to X_test[seq_length:]
-            dummy[:, :] = self.X_test[self.seq_length:, :]
-            
-            # Replace target col with prediction
-            target_idx = list(self.data.columns).index(self.target_col) if 'Date' not in self.data.columns else list(self.data.drop('Date', axis=1).columns).index(self.target_col)
-            dummy[:, target_idx] = preds.flatten()
-            
-            inversed = self.scalers['feature_scaler'].inverse_transform(dummy)
-            return inversed[:, target_idx]
-            
+            preds = preds.reshape(len(preds), -1) if self.n_outputs > 1 else preds.flatten()
         else:
             # ML models
             preds = model.predict(self.X_test)
-            dummy = np.zeros((len(preds), self.X_test.shape[1]))
-            dummy[:, :] = self.X_test
-            target_idx = list(self.data.columns).index(self.target_col) if 'Date' not in self.data.columns else list(self.data.drop('Date', axis=1).columns).index(self.target_col)
-            dummy[:, target_idx] = preds
-            inversed = self.scalers['feature_scaler'].inverse_transform(dummy)
-            return inversed[:, target_idx]
+        return self.inverse_transform_target(preds)
     
     def get_actual_values(self, model_name):
         """Returns actual values corresponding to the test set of the model."""
-        # For LSTM, test set is smaller by seq_length
-        target_idx = list(self.data.columns).index(self.target_col) if 'Date' not in self.data.columns else list(self.data.drop('Date', axis=1).columns).index(self.target_col)
-        
+        # For LSTM, test set is smaller by the rows before the first window's target
         if model_name in ['LSTM', 'BiLSTM']:
-             # X_test[seq_length:] contains the rows for which we made predictions
-             dummy = np.zeros((len(self.X_test) - self.seq_length, self.X_test.shape[1]))
-             dummy[:, :] = self.X_test[self.seq_length:, :]
-        else:
-            dummy = np.zeros((len(self.X_test), self.X_test.shape[1]))
-            dummy[:, :] = self.X_test
-            
-        inversed = self.scalers['feature_scaler'].inverse_transform(dummy)
-        return inversed[:, target_idx]
+            return self.inverse_transform_target(self.y_test[self.window_target_offset:])
+        return self.inverse_transform_target(self.y_test)
@@ -0,0 +1,285 @@
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+from src.risk_analysis import TRADING_DAYS, batch_risk_metrics
+
+def daily_returns(prices):
+    """
+    Daily_Return matrix (days x tickers) from a wide price frame, keeping only
+    days on which every ticker has a return so the covariance stays positive
+    semi-definite.
+    """
+    returns = prices.sort_index().pct_change(fill_method=None)
+    return returns.dropna(how='any')
+
+class IncrementalLedoitWolf:
+    """
+    Ledoit-Wolf shrunk covariance of daily returns, updated as new days arrive.
+
+    Only running sums are kept: the count n, sum(x), sum(x x^T), sum(|x|^2 x)
+    and sum(|x|^4) of the raw return rows. They are enough to re-centre on the
+    current mean and evaluate the Ledoit-Wolf shrinkage exactly as
+    sklearn.covariance.ledoit_wolf does, so an update costs O(days x p^2)
+    for the new days only and no history is re-read. With `window` the oldest
+    days are subtracted again once more than `window` are held (rolling
+    estimate; the rows are then kept for that purpose).
+    """
+
+    def __init__(self, n_assets, window=None):
+        self.n_assets = n_assets
+        self.window = window
+        self.n = 0
+        self.s1 = np.zeros(n_assets)
+        self.s2 = np.zeros((n_assets, n_assets))
+        self.s3 = np.zeros(n_assets)
+        self.s4 = 0.0
+        self._rows = deque()
+
+    def _accumulate(self, rows, sign):
+        sq_norms = np.einsum('ij,ij->i', rows, rows)
+        self.n += sign * len(rows)
+        self.s1 += sign * rows.sum(axis=0)
+        self.s2 += sign * (rows.T @ rows)
+        self.s3 += sign * (sq_norms @ rows)
+        self.s4 += sign * float(sq_norms @ sq_norms)
+
+    def update(self, returns):
+        """Adds one day (p,) or several days (days, p) of returns."""
+        rows = np.atleast_2d(np.asarray(returns, dtype=np.float64))
+        if rows.shape[1] != self.n_assets:
+            raise ValueError(f"Expected {self.n_assets} returns per day, got {rows.shape[1]}")
+        # One NaN would poison every running sum for good
+        if not np.isfinite(rows).all():
+            raise ValueError("Returns contain NaN or inf; drop or fill the missing days first.")
+        self._accumulate(rows, 1)
+        if self.window is not None:
+            self._rows.extend(rows)
+            excess = len(self._rows) - self.window
+            if excess > 0:
+                self._accumulate(np.array([self._rows.popleft() for _ in range(excess)]), -1)
+        return self
+
+    @property
+    def mean(self):
+        return self.s1 / self.n
+
+    def empirical_covariance(self):
+        """Maximum-likelihood (1/n) covariance of the rows seen so far."""
+        m = self.mean
+        return self.s2 / self.n - np.outer(m, m)
+
+    def shrinkage(self):
+        """Ledoit-Wolf shrinkage intensity in [0, 1] (sklearn's estimator)."""
+        n, p = self.n, self.n_assets
+        m = self.mean
+        emp_cov = self.empirical_covariance()
+        trace = np.trace(emp_cov)
+        mu = trace / p
+        # sum over days of |x - m|^4, expanded in the running sums
+        c = m @ m
+        sum_a = np.trace(self.s2)
+        sum_b = self.s1 @ m
+        beta_ = (self.s4 + 4 * m @ self.s2 @ m + n * c ** 2 - 4 * self.s3 @ m
+                 + 2 * c * sum_a - 4 * c * sum_b)
+        delta_ = np.sum(emp_cov ** 2)
+        beta = (beta_ / n - delta_) / (p * n)
+        delta = (delta_ - 2 * mu * trace + p * mu ** 2) / p
+        beta = min(beta, delta)
+        return 0.0 if beta == 0 else beta / delta
+
+    def covariance(self):
+        """Shrunk covariance (1 - s) * S + s * mu * I."""
+        if self.n < 2:
+            raise ValueError("At least two days of returns are needed.")
+        emp_cov = self.empirical_covariance()
+        shrinkage = self.shrinkage()
+        mu = np.trace(emp_cov) / self.n_assets
+        cov = (1 - shrinkage) * emp_cov
+        cov.flat[::self.n_assets + 1] += shrinkage * mu
+        return cov
+
+def _solve(cov, rhs):
+    """Solves cov @ x = rhs through one Cholesky factorization."""
+    from scipy.linalg import cho_factor, cho_solve
+    return cho_solve(cho_factor(cov), rhs)
+
+def efficient_frontier(mu, cov, target_returns):
+    """
+    Minimum-variance fully invested weights for many target returns at once.
+
+    Closed form of min w'Cw s.t. 1'w = 1, mu'w = r (short positions allowed):
+    w = C^-1 [1 mu] A^-1 [1 r]^T with A = [1 mu]' C^-1 [1 mu]. The covariance
+    is factorized once and every target is a column of one matrix product.
+    Returns (weights (k, p), expected returns (k,), volatilities (k,)).
+    """
+    mu = np.asarray(mu, dtype=np.float64)
+    targets = np.atleast_1d(np.asarray(target_returns, dtype=np.float64))
+    basis = np.column_stack([np.ones_like(mu), mu])
+    cinv_basis = _solve(cov, basis)
+    A = basis.T @ cinv_basis
+    weights = (cinv_basis @ np.linalg.solve(A, np.vstack([np.ones_like(targets), targets]))).T
+    variances = np.sum((weights @ cov) * weights, axis=1)
+    return weights, weights @ mu, np.sqrt(np.maximum(variances, 0))
+
+def mean_variance_weights(mu, cov, target_return=None):
+    """
+    Fully invested mean-variance weights (short positions allowed). Without a
+    target return this is the global minimum-variance portfolio.
+    """
+    if target_return is None:
+        w = _solve(cov, np.ones(len(cov)))
+        return w / w.sum()
+    return efficient_frontier(mu, cov, [target_return])[0][0]
+
+def risk_parity_weights(cov, budgets=None, tol=1e-10, max_iter=50):
+    """
+    Long-only weights whose risk contributions w_i (Cw)_i match `budgets`
+    (equal by default).
+
+    Newton's method on the convex problem min 1/2 y'Cy - sum(b log y), whose
+    optimum satisfies y_i (Cy)_i = b_i; the weights are y normalized to sum
+    to 1. Each step is one linear solve, and it typically converges in under
+    ten steps.
+    """
+    cov = np.asarray(cov, dtype=np.float64)
+    p = len(cov)
+    b = np.full(p, 1.0 / p) if budgets is None else np.asarray(budgets, dtype=np.float64) / np.sum(budgets)
+    y = b / np.sqrt(np.diag(cov)) # Inverse-volatility start
+    y *= np.sqrt(b.sum() / (y @ cov @ y))
+    for _ in range(max_iter):
+        grad = cov @ y - b / y
+        if np.max(np.abs(grad)) < tol:
+            break
+        hessian = cov.copy()
+        hessian.flat[::p + 1] += b / y ** 2
+        step = _solve(hessian, grad)
+        # Backtrack so y stays strictly positive
+        t = 1.0
+        while np.any(y - t * step <= 0):
+            t *= 0.5
+        y = y - t * step
+    return y / y.sum()
+
+def min_cvar_weights(scenarios, confidence_level=0.95, target_return=None, long_only=True):
+    """
+    Weights minimizing the CVaR of portfolio returns over historical (or
+    simulated) scenario rows, via the Rockafellar-Uryasev linear program
+    solved with HiGHS:
+
+        min  z + 1/((1-a) T) sum(u)
+        s.t. u_t >= -r_t'w - z,  u >= 0,  sum(w) = 1,  [mean(r)'w >= target]
+
+    scenarios: (T, p) returns. Returns (weights, CVaR).
+    """
+    from scipy.optimize import linprog
+    from scipy.sparse import csr_matrix, hstack, identity, vstack
+
+    R = np.asarray(scenarios, dtype=np.float64)
+    T, p = R.shape
+    # Variables: w (p), z (1), u (T)
+    c = np.concatenate([np.zeros(p), [1.0], np.full(T, 1.0 / ((1 - confidence_level) * T))])
+    A_ub = hstack([csr_matrix(-R), csr_matrix(-np.ones((T, 1))), -identity(T, format='csr')], format='csr')
+    b_ub = np.zeros(T)
+    if target_return is not None:
+        target_row = csr_matrix(np.concatenate([-R.mean(axis=0), np.zeros(1 + T)])[None, :])
+        A_ub = vstack([A_ub, target_row], format='csr')
+        b_ub = np.append(b_ub, -target_return)
+    A_eq = np.concatenate([np.ones(p), np.zeros(1 + T)])[None, :]
+    bounds = [(0, None) if long_only else (None, None)] * p + [(None, None)] + [(0, None)] * T
+    result = linprog(c, A_ub=A_ub, b_ub=b_ub, A_eq=A_eq, b_eq=[1.0], bounds=bounds, method='highs')
+    if not result.success:
+        raise ValueError(f"Minimum-CVaR problem could not be solved: {result.message}")
+    return result.x[:p], float(result.fun)
+
+class PortfolioOptimizer:
+    """
+    Portfolio construction across tickers from their daily returns.
+
+    Holds an IncrementalLedoitWolf covariance (and the running mean return)
+    that new days can be added to with update(), so rebalancing only pays for
+    the solve. Weights can be scored with the same risk metrics RiskAnalyzer
+    reports for a single series.
+    """
+
+    def __init__(self, prices, window=None):
+        returns = daily_returns(prices)
+        self.tickers = list(returns.columns)
+        self.returns = returns
+        self.estimator = IncrementalLedoitWolf(len(self.tickers), window=window).update(returns.to_numpy())
+
+    @classmethod
+    def from_frames(cls, frames, col='Close', window=None):
+        """Builds the optimizer from {ticker: DataFrame with Date and price columns}."""
+        prices = pd.DataFrame({t: pd.Series(df[col].to_numpy(), index=pd.to_datetime(df['Date']))
+                               for t, df in frames.items()})
+        return cls(prices, window=window)
+
+    def update(self, new_returns, dates=None):
+        """
+        Adds new days of returns: a frame with the same tickers, or an array
+        (days, p) in ticker order. Array rows are dated with `dates`, or else
+        as the business days following the last held one (the next positions
+        when the returns are not indexed by date). Rows with NaN are rejected.
+        """
+        if isinstance(new_returns, pd.DataFrame):
+            new_returns = new_returns[self.tickers]
+        else:
+            rows = np.atleast_2d(np.asarray(new_returns, dtype=np.float64))
+            if dates is None:
+                index = self.returns.index
+                if isinstance(index, pd.DatetimeIndex) and len(index):
+                    dates = pd.bdate_range(index[-1], periods=len(rows) + 1)[1:]
+                else:
+                    dates = pd.RangeIndex(len(index), len(index) + len(rows))
+            new_returns = pd.DataFrame(rows, index=dates, columns=self.tickers)
+        # The estimator validates the rows before anything is kept
+        self.estimator.update(new_returns.to_numpy())
+        self.returns = pd.concat([self.returns, new_returns])
+        return self
+
+    @property
+    def expected_returns(self):
+        return self.estimator.mean
+
+    def covariance(self):
+        return self.estimator.covariance()
+
+    def _as_series(self, weights):
+        return pd.Series(weights, index=self.tickers)
+
+    def mean_variance(self, target_return=None):
+        return self._as_series(mean_variance_weights(self.expected_returns, self.covariance(), target_return))
+
+    def efficient_frontier(self, n_points=50, target_returns=None):
+        """Frontier between the minimum-variance return and the best single-asset return, in one call."""
+        mu, cov = self.expected_returns, self.covariance()
+        if target_returns is None:
+            low = mean_variance_weights(mu, cov) @ mu
+            target_returns = np.linspace(low, mu.max(), n_points)
+        weights, rets, vols = efficient_frontier(mu, cov, target_returns)
+        frontier = pd.DataFrame(weights, columns=self.tickers)
+        frontier.insert(0, 'volatility', vols * np.sqrt(TRADING_DAYS))
+        frontier.insert(0, 'expected_return', rets * TRADING_DAYS)
+        return frontier
+
+    def risk_parity(self, budgets=None):
+        return self._as_series(risk_parity_weights(self.covariance(), budgets))
+
+    def min_cvar(self, confidence_level=0.95, target_return=None, long_only=True):
+        rows = self.returns.to_numpy()
+        if self.estimator.window is not None:
+            rows = rows[-self.estimator.window:]
+        weights, _ = min_cvar_weights(rows, confidence_level, target_return, long_only)
+        return self._as_series(weights)
+
+    def risk_metrics(self, weights):
+        """
+        RiskAnalyzer metrics of the portfolio value path for one weight vector
+        (p,) or many (k, p), from the historical returns.
+        """
+        weights = np.atleast_2d(np.asarray(weights, dtype=np.float64))
+        portfolio_returns = self.returns.to_numpy() @ weights.T
+        values = np.vstack([np.ones(len(weights)), np.cumprod(1 + portfolio_returns, axis=0)]).T
+        return batch_risk_metrics(values)
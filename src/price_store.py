@@ -0,0 +1,174 @@
+import json
+import os
+import threading
+from collections import defaultdict
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+class PriceStore:
+    """
+    Local columnar store holding one date-indexed price history per ticker.
+
+    Each ticker is kept as two memory-mapped NumPy files (dates and a 2-D
+    float64 value block) plus a small JSON sidecar recording the columns, the
+    date range already covered and a version counter. Reading a range is a
+    slice of the memory map, so overlapping queries share the same bytes on
+    disk and in the page cache. Writes go to a new versioned file pair; the
+    previous pair is only deleted by the merge after, so a reader that read
+    the old metadata just before a merge can still open its files (and
+    get_arrays retries once with fresh metadata if even that pair is gone).
+    """
+
+    _locks = defaultdict(threading.Lock)
+    _locks_guard = threading.Lock()
+
+    @classmethod
+    def lock(cls, ticker):
+        """Per-ticker lock serialising fetch-and-merge between threads of one process."""
+        with cls._locks_guard:
+            return cls._locks[ticker]
+
+    def __init__(self, store_dir):
+        self.store_dir = store_dir
+        os.makedirs(self.store_dir, exist_ok=True)
+
+    def _meta_path(self, ticker):
+        return os.path.join(self.store_dir, f"{ticker}.json")
+
+    def _array_paths(self, ticker, version):
+        base = os.path.join(self.store_dir, f"{ticker}.v{version}")
+        return f"{base}.dates.npy", f"{base}.values.npy"
+
+    def read_meta(self, ticker):
+        """Returns the sidecar metadata for a ticker, or None if it is not stored."""
+        path = self._meta_path(ticker)
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            return json.load(f)
+
+    def version(self, ticker):
+        """Monotonic counter that changes whenever the ticker's data is rewritten."""
+        meta = self.read_meta(ticker)
+        return meta['version'] if meta else 0
+
+    def missing_ranges(self, ticker, start_date, end_date):
+        """Returns the [start, end) pieces of a request not covered by the store."""
+        meta = self.read_meta(ticker)
+        if meta is None:
+            return [(start_date, end_date)]
+        start, end = pd.Timestamp(start_date), pd.Timestamp(end_date)
+        covered_start, covered_end = pd.Timestamp(meta['start']), pd.Timestamp(meta['end'])
+        missing = []
+        # A missing head/tail always reaches back to the covered range so it stays contiguous
+        if start < covered_start:
+            missing.append((start_date, meta['start']))
+        if end > covered_end:
+            missing.append((meta['end'], end_date))
+        return missing
+
+    def _load_version(self, ticker):
+        """Maps the current version's (dates, values) and returns them with the metadata."""
+        for attempt in range(2):
+            meta = self.read_meta(ticker)
+            if meta is None:
+                return None
+            dates_path, values_path = self._array_paths(ticker, meta['version'])
+            try:
+                return meta, np.load(dates_path, mmap_mode='r'), np.load(values_path, mmap_mode='r')
+            except FileNotFoundError:
+                # Two merges landed between reading the metadata and opening the files
+                if attempt:
+                    raise
+
+    def get_arrays(self, ticker, start_date, end_date):
+        """Returns (dates, values, columns) for [start, end) as views of the memory map."""
+        loaded = self._load_version(ticker)
+        if loaded is None:
+            return None
+        meta, dates, values = loaded
+        i0 = np.searchsorted(dates, np.datetime64(pd.Timestamp(start_date), 's'), side='left')
+        i1 = np.searchsorted(dates, np.datetime64(pd.Timestamp(end_date), 's'), side='left')
+        return dates[i0:i1], values[i0:i1], meta['columns']
+
+    def get_range(self, ticker, start_date, end_date):
+        """
+        Returns [start, end) as a DataFrame with a Date column. The frame holds
+        its own copy of the rows; use get_arrays() for views of the memory map.
+        """
+        arrays = self.get_arrays(ticker, start_date, end_date)
+        if arrays is None:
+            return None
+        dates, values, columns = arrays
+        df = pd.DataFrame(values, columns=columns, copy=True)
+        df.insert(0, 'Date', dates)
+        return df
+
+    def merge(self, ticker, df, start_date, end_date):
+        """
+        Merges freshly fetched bars for [start, end) into the stored history.
+
+        Bars for dates already stored are replaced by the new ones. The covered
+        range is extended to include the request, capped at today so that a
+        later request picks up bars published since.
+        """
+        meta = self.read_meta(ticker)
+        start, end = pd.Timestamp(start_date), min(pd.Timestamp(end_date), pd.Timestamp(date.today()))
+
+        new_dates = pd.to_datetime(df['Date']) if len(df) else pd.Series([], dtype='datetime64[ns]')
+        if getattr(new_dates.dt, 'tz', None) is not None:
+            new_dates = new_dates.dt.tz_localize(None)
+        new_dates = new_dates.to_numpy().astype('datetime64[s]')
+
+        if meta is not None and len(df) == 0 and \
+                start >= pd.Timestamp(meta['start']) and end <= pd.Timestamp(meta['end']):
+            return meta
+
+        if meta is None:
+            columns = [c for c in df.columns if c != 'Date']
+            dates = new_dates
+            values = df[columns].to_numpy(dtype=np.float64)
+            covered_start, covered_end = start, end
+            version = 1
+        else:
+            columns = meta['columns']
+            old_dates_path, old_values_path = self._array_paths(ticker, meta['version'])
+            old_dates = np.load(old_dates_path, mmap_mode='r')
+            old_values = np.load(old_values_path, mmap_mode='r')
+            new_values = df.reindex(columns=columns).to_numpy(dtype=np.float64)
+            keep = ~np.isin(old_dates, new_dates)
+            dates = np.concatenate([old_dates[keep], new_dates])
+            values = np.concatenate([old_values[keep], new_values])
+            covered_start = min(start, pd.Timestamp(meta['start']))
+            covered_end = max(end, pd.Timestamp(meta['end']))
+            version = meta['version'] + 1
+
+        order = np.argsort(dates, kind='stable')
+        dates_path, values_path = self._array_paths(ticker, version)
+        np.save(dates_path, dates[order])
+        np.save(values_path, np.ascontiguousarray(values[order]))
+
+        new_meta = {
+            'columns': columns,
+            'start': covered_start.strftime('%Y-%m-%d'),
+            'end': covered_end.strftime('%Y-%m-%d'),
+            'version': version,
+            'rows': int(len(dates)),
+        }
+        tmp_path = self._meta_path(ticker) + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(new_meta, f, indent=2)
+        os.replace(tmp_path, self._meta_path(ticker))
+
+        if meta is not None and meta['version'] > 1:
+            # The version just replaced may be opened by a reader that read the
+            # old metadata, so only the one before it is removed (removal can
+            # still fail while a map is open on Windows)
+            for path in self._array_paths(ticker, meta['version'] - 1):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+        return new_meta
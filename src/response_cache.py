@@ -0,0 +1,47 @@
+import threading
+import time
+from collections import OrderedDict
+from src import instrumentation
+
+class TTLCache:
+    """
+    Thread-safe bounded LRU cache whose entries expire after `ttl` seconds.
+
+    Used by the backend to keep recent API responses; the least recently used
+    entry is dropped once `max_entries` is reached. With a `name`, lookups
+    are counted as cache hits and misses in the instrumentation metrics.
+    """
+
+    def __init__(self, max_entries=256, ttl=300, name=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.name = name
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Returns the cached value, or None if missing or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] < time.monotonic():
+                del self._entries[key]
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+        if self.name is not None:
+            instrumentation.cache_lookup(self.name, hit=entry is not None)
+        return None if entry is None else entry[1]
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
@@ -1,66 +1,94 @@
 import numpy as np
 import pandas as pd
+from src import instrumentation
+
+TRADING_DAYS = 252
+
+# The helpers below work along the last axis, so they score a single series
+# (n_days,) or a whole batch (n_series, n_days) in one vectorized pass.
+
+def _simple_returns(prices):
+    return np.diff(prices, axis=-1) / prices[..., :-1]
+
+def _volatility(returns):
+    return np.std(returns, axis=-1)
+
+def _max_drawdown(prices):
+    # Running peak via cumulative max instead of a per-element loop
+    peaks = np.maximum.accumulate(prices, axis=-1)
+    return np.maximum(np.max((peaks - prices) / peaks, axis=-1), 0)
+
+def _var(returns, confidence_level):
+    n = returns.shape[-1]
+    if n == 0:
+        return np.zeros(returns.shape[:-1])
+    # Only the k-th smallest return is needed, so partition instead of a full sort
+    index = int((1 - confidence_level) * n)
+    return np.abs(np.take(np.partition(returns, index, axis=-1), index, axis=-1))
+
+def _sharpe_ratio(returns, risk_free_rate):
+    mean_return = np.mean(returns, axis=-1)
+    std_return = np.std(returns, axis=-1)
+    annualized_return = mean_return * TRADING_DAYS
+    annualized_std = std_return * np.sqrt(TRADING_DAYS)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        sharpe = (annualized_return - risk_free_rate) / annualized_std
+    return np.where(std_return == 0, 0.0, sharpe)
+
+def batch_risk_metrics(prices, confidence_level=0.95, risk_free_rate=0.0):
+    """
+    Computes all risk metrics for many price series at once.
+
+    prices: array of shape (n_series, n_days). Returns are computed once and
+    shared by every metric. Returns a dict of arrays of length n_series, keyed
+    like RiskAnalyzer.get_risk_metrics.
+    """
+    prices = np.atleast_2d(np.asarray(prices, dtype=float))
+    returns = _simple_returns(prices)
+    return {
+        "Volatility": _volatility(returns),
+        "Max Drawdown": _max_drawdown(prices),
+        "VaR (95%)": _var(returns, confidence_level),
+        "Sharpe Ratio": _sharpe_ratio(returns, risk_free_rate)
+    }
 
 class RiskAnalyzer:
     def __init__(self, actual_prices, predicted_prices):
         self.actual = np.array(actual_prices)
         self.predicted = np.array(predicted_prices)
         
+    # The calculate_* methods share the vectorized helpers of batch_risk_metrics
+    # and return plain Python floats for a single series
+
     def calculate_volatility(self, prices=None):
         """Std dev of returns."""
         if prices is None:
             prices = self.predicted
-        returns = np.diff(prices) / prices[:-1]
-        return np.std(returns)
+        return float(_volatility(_simple_returns(np.asarray(prices, dtype=float))))
 
     def calculate_max_drawdown(self, prices=None):
         """Maximum observed loss from a peak to a trough."""
         if prices is None:
             prices = self.predicted
-        peak = prices[0]
-        max_drawdown = 0
-        for price in prices:
-            if price > peak:
-                peak = price
-            dd = (peak - price) / peak
-            if dd > max_drawdown:
-                max_drawdown = dd
-        return max_drawdown
+        return float(_max_drawdown(np.asarray(prices, dtype=float)))
 
     def calculate_var(self, prices=None, confidence_level=0.95):
         """Value at Risk using Historical Simulation method on returns."""
         if prices is None:
             prices = self.predicted
-        returns = np.diff(prices) / prices[:-1]
-        if len(returns) == 0:
-            return 0.0
-        # Sort returns
-        sorted_returns = np.sort(returns)
-        # Index for Var
-        index = int((1 - confidence_level) * len(sorted_returns))
-        return abs(sorted_returns[index]) # Return as positive percentage
+        return float(_var(_simple_returns(np.asarray(prices, dtype=float)), confidence_level)) # Return as positive percentage
 
     def calculate_sharpe_ratio(self, prices=None, risk_free_rate=0.0):
         """Annualized Sharpe Ratio (assuming daily data, 252 trading days)."""
         if prices is None:
             prices = self.predicted
-        returns = np.diff(prices) / prices[:-1]
-        mean_return = np.mean(returns)
-        std_return = np.std(returns)
-        if std_return == 0:
-            return 0.0
-        annualized_return = mean_return * 252
-        annualized_std = std_return * np.sqrt(252)
-        return (annualized_return - risk_free_rate) / annualized_std
+        return float(_sharpe_ratio(_simple_returns(np.asarray(prices, dtype=float)), risk_free_rate))
 
+    @instrumentation.timed('risk.get_risk_metrics')
     def get_risk_metrics(self):
         """Returns a dict of all risk metrics."""
-        return {
-            "Volatility": self.calculate_volatility(),
-            "Max Drawdown": self.calculate_max_drawdown(),
-            "VaR (95%)": self.calculate_var(),
-            "Sharpe Ratio": self.calculate_sharpe_ratio()
-        }
+        metrics = batch_risk_metrics(self.predicted[np.newaxis, :])
+        return {name: float(values[0]) for name, values in metrics.items()}
 
     def risk_aware_decision_score(self, predicted_return, risk_metrics):
         """
@@ -0,0 +1,141 @@
+import math
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+class MonteCarloSimulator:
+    """
+    Monte Carlo wealth projection from a series of daily returns.
+
+    Paths are generated in fixed-size chunks and reduced on the fly, so memory
+    stays bounded by the chunk size rather than the number of paths:
+    - percentile bands come from per-day histograms of log-wealth,
+    - VaR and CVaR of the terminal return are exact, keeping only the worst
+      (1 - confidence) share of terminal returns seen so far.
+    Chunks are independent (one seeded generator each) and run on a thread
+    pool of n_workers (inline with one), at most two per worker in flight;
+    results do not depend on the number of workers. Callers that already run
+    on a pool (the API) should cap n_workers instead of using every core.
+    """
+
+    METHODS = ('gbm', 'bootstrap')
+
+    def __init__(self, daily_returns, initial_value=1.0, seed=None):
+        returns = np.asarray(daily_returns, dtype=float)
+        returns = returns[np.isfinite(returns)]
+        if len(returns) < 2:
+            raise ValueError("At least two daily returns are needed to simulate.")
+        self.initial_value = initial_value
+        self.seed = seed
+        self.log_returns = np.log1p(returns)
+        self.mu = self.log_returns.mean()
+        self.sigma = self.log_returns.std(ddof=1)
+
+    def _simulate_chunk(self, seed_seq, n, horizon, method):
+        """Returns cumulative log-returns of shape (n, horizon) as float32."""
+        rng = np.random.default_rng(seed_seq)
+        if method == 'gbm':
+            steps = rng.standard_normal((n, horizon), dtype=np.float32)
+            steps *= np.float32(self.sigma)
+            steps += np.float32(self.mu)
+        else:
+            # Bootstrap: resample observed daily log-returns with replacement
+            idx = rng.integers(0, len(self.log_returns), size=(n, horizon))
+            steps = self.log_returns.astype(np.float32)[idx]
+        return np.cumsum(steps, axis=1, out=steps)
+
+    def run(self, n_paths=100_000, horizon=252, method='gbm', chunk_size=20_000,
+            percentiles=(5, 25, 50, 75, 95), confidence_level=0.95, n_bins=2048, n_workers=None):
+        """
+        Simulates n_paths wealth paths over `horizon` trading days.
+
+        Returns a dict with the percentile bands (one value per day, starting
+        at initial_value), the expected terminal value, the probability of a
+        loss, and terminal VaR / CVaR as positive fractions of initial_value.
+        """
+        if method not in self.METHODS:
+            raise ValueError(f"Unknown simulation method '{method}', expected one of {self.METHODS}")
+        n_chunks = math.ceil(n_paths / chunk_size)
+        sizes = [min(chunk_size, n_paths - i * chunk_size) for i in range(n_chunks)]
+        seeds = np.random.SeedSequence(self.seed).spawn(n_chunks)
+
+        # Log-wealth grid per day: mean drift +/- 10 sigma * sqrt(t) (values outside are clipped)
+        t = np.arange(1, horizon + 1)
+        spread = 10 * max(self.sigma, 1e-8) * np.sqrt(t) + np.abs(self.log_returns).max()
+        lo = (self.mu * t - spread).astype(np.float32)
+        inv_width = (n_bins / (2 * spread)).astype(np.float32)
+        offsets = (np.arange(horizon) * n_bins).astype(np.int64)
+
+        tail_size = max(1, math.ceil(round((1 - confidence_level) * n_paths, 9)))
+
+        def reduce_chunk(i):
+            paths = self._simulate_chunk(seeds[i], sizes[i], horizon, method)
+            bins = ((paths - lo) * inv_width).astype(np.int64)
+            np.clip(bins, 0, n_bins - 1, out=bins)
+            bins += offsets
+            counts = np.bincount(bins.ravel(), minlength=horizon * n_bins)
+            terminal = np.expm1(paths[:, -1].astype(np.float64))
+            k = min(tail_size, len(terminal))
+            worst = np.partition(terminal, k - 1)[:k]
+            return counts, worst, terminal.sum(), np.count_nonzero(terminal < 0)
+
+        counts = np.zeros(horizon * n_bins, dtype=np.int64)
+        tail = np.empty(0)
+        total_return = 0.0
+        n_losses = 0
+        def reduced_chunks(n_workers):
+            """Chunk results in chunk order, submitted as workers free up rather than all at once."""
+            if n_workers <= 1:
+                yield from map(reduce_chunk, range(n_chunks))
+                return
+            with ThreadPoolExecutor(max_workers=n_workers) as pool:
+                pending = deque()
+                for i in range(n_chunks):
+                    pending.append(pool.submit(reduce_chunk, i))
+                    if len(pending) >= 2 * n_workers:
+                        yield pending.popleft().result()
+                while pending:
+                    yield pending.popleft().result()
+
+        n_workers = min(n_workers or os.cpu_count() or 1, n_chunks)
+        for chunk_counts, worst, chunk_sum, chunk_losses in reduced_chunks(n_workers):
+            counts += chunk_counts
+            tail = np.concatenate([tail, worst])
+            if len(tail) > tail_size:
+                tail = np.partition(tail, tail_size - 1)[:tail_size]
+            total_return += chunk_sum
+            n_losses += chunk_losses
+
+        bands = self._percentiles_from_histogram(counts.reshape(horizon, n_bins), lo, inv_width, n_paths, percentiles)
+        var = -tail.max()
+        cvar = -tail.mean()
+        return {
+            'method': method,
+            'n_paths': n_paths,
+            'horizon': horizon,
+            'percentiles': bands,
+            'expected_terminal_value': self.initial_value * (1 + total_return / n_paths),
+            'probability_of_loss': n_losses / n_paths,
+            'confidence_level': confidence_level,
+            'VaR': max(var, 0.0),
+            'CVaR': max(cvar, 0.0),
+        }
+
+    def _percentiles_from_histogram(self, counts, lo, inv_width, n_paths, percentiles):
+        """Interpolates percentile wealth levels per day from the log-wealth histograms."""
+        cdf = np.cumsum(counts, axis=1)
+        width = 1.0 / inv_width.astype(np.float64)
+        rows = np.arange(counts.shape[0])
+        bands = {}
+        for p in percentiles:
+            target = p / 100 * n_paths
+            idx = np.argmax(cdf >= target, axis=1)
+            below = np.where(idx > 0, cdf[rows, idx - 1], 0)
+            in_bin = np.maximum(counts[rows, idx], 1)
+            frac = np.clip((target - below) / in_bin, 0, 1)
+            log_wealth = lo + width * (idx + frac)
+            path = self.initial_value * np.exp(log_wealth)
+            bands[p] = np.concatenate([[self.initial_value], path])
+        return bands
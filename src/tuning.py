@@ -0,0 +1,224 @@
+import hashlib
+import json
+import math
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from src import instrumentation
+from src.models import RANDOM_FOREST_PARAMS, XGBOOST_PARAMS
+
+# Candidate values per hyperparameter. n_estimators is not searched: it is the
+# resource that successive halving hands out.
+SEARCH_SPACES = {
+    'RandomForest': {
+        'max_depth': [None, 4, 6, 10, 16],
+        'min_samples_leaf': [1, 2, 5, 10],
+        'max_features': [1.0, 0.5, 'sqrt'],
+    },
+    'XGBoost': {
+        'learning_rate': [0.01, 0.03, 0.05, 0.1, 0.2],
+        'max_depth': [3, 4, 6, 8],
+        'subsample': [0.6, 0.8, 1.0],
+        'colsample_bytree': [0.6, 0.8, 1.0],
+        'min_child_weight': [1, 3, 5],
+        'reg_lambda': [0.1, 1.0, 10.0],
+    },
+}
+DEFAULT_PARAMS = {'RandomForest': RANDOM_FOREST_PARAMS, 'XGBoost': XGBOOST_PARAMS}
+
+_best_params_lock = threading.Lock()
+
+def _params_key(params):
+    return json.dumps(params, sort_keys=True, default=str)
+
+def _best_params_path(tuning_dir):
+    return os.path.join(tuning_dir, 'best_params.json')
+
+def _read_best_params(tuning_dir):
+    path = _best_params_path(tuning_dir)
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        print(f"Tuning results at {path} are unreadable, ignoring them.")
+        return {}
+
+def load_best_params(ticker, model_name, tuning_dir='tuning'):
+    """Returns the persisted best hyperparameters for a ticker and model, or None."""
+    entry = _read_best_params(tuning_dir).get(ticker.upper(), {}).get(model_name)
+    return entry['params'] if entry else None
+
+def save_best_params(ticker, model_name, params, score, tuning_dir='tuning', horizon=None):
+    """Records the best hyperparameters found for a ticker and model (and the horizon tuned for)."""
+    with _best_params_lock:
+        os.makedirs(tuning_dir, exist_ok=True)
+        best = _read_best_params(tuning_dir)
+        best.setdefault(ticker.upper(), {})[model_name] = {
+            'params': params,
+            'validation_rmse': score,
+            'horizon': horizon,
+            'updated': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        }
+        path = _best_params_path(tuning_dir)
+        with open(path + '.tmp', 'w') as f:
+            json.dump(best, f, indent=2)
+        os.replace(path + '.tmp', path)
+
+class HyperbandTuner:
+    """
+    Hyperparameter search for RandomForest and XGBoost on a split ModelTrainer.
+
+    The last `validation_size` share of the training rows is held out as a
+    validation tail (the test rows are never looked at). Configurations are
+    sampled from SEARCH_SPACES and compared with successive halving: all of
+    them get `min_resource` trees, the best 1/eta advance with eta times more,
+    until `max_resource`. hyperband() runs several such brackets, trading
+    the number of configurations against their starting budget. XGBoost trials
+    also stop early once the validation error stops improving.
+
+    Trials run on a thread pool (both libraries release the GIL while
+    fitting). Every trial result is memoized on disk under a hash of the
+    training data, so repeating a search over the same data is free.
+    """
+
+    def __init__(self, trainer, model_name='XGBoost', validation_size=0.2, min_resource=10,
+                 max_resource=270, eta=3, n_jobs=None, tuning_dir='tuning', seed=42):
+        if model_name not in SEARCH_SPACES:
+            raise ValueError(f"Tuning supports {list(SEARCH_SPACES)}, not {model_name}")
+        if trainer.X_train is None:
+            raise ValueError("Call load_dataset() or split_data() on the trainer before tuning.")
+        self.model_name = model_name
+        self.min_resource = min_resource
+        self.max_resource = max_resource
+        self.eta = eta
+        self.n_jobs = n_jobs or os.cpu_count() or 1
+        self.n_threads = max(1, (os.cpu_count() or 1) // self.n_jobs)
+        self.tuning_dir = tuning_dir
+        self.rng = np.random.default_rng(seed)
+
+        n_val = max(1, int(len(trainer.X_train) * validation_size))
+        X, y = np.asarray(trainer.X_train), np.asarray(trainer.y_train)
+        self.X_fit, self.X_val = X[:-n_val], X[-n_val:]
+        self.y_fit, self.y_val = y[:-n_val], y[-n_val:]
+
+        digest = hashlib.sha1()
+        for arr in (X, y):
+            digest.update(str((arr.shape, arr.dtype.str)).encode('utf-8'))
+            digest.update(np.ascontiguousarray(arr).tobytes())
+        digest.update(f"{model_name}:{n_val}".encode('utf-8'))
+        self.data_hash = digest.hexdigest()
+        self.trials_path = os.path.join(tuning_dir, 'trials', f"{self.data_hash}.json")
+        self._trials = self._read_trials()
+        self._lock = threading.Lock()
+        self.n_fitted = 0
+
+    def _read_trials(self):
+        if os.path.exists(self.trials_path):
+            try:
+                with open(self.trials_path) as f:
+                    return json.load(f)
+            except (OSError, ValueError):
+                pass
+        return {}
+
+    def _write_trials(self):
+        os.makedirs(os.path.dirname(self.trials_path), exist_ok=True)
+        with open(self.trials_path + '.tmp', 'w') as f:
+            json.dump(self._trials, f)
+        os.replace(self.trials_path + '.tmp', self.trials_path)
+
+    def sample_configs(self, n):
+        """Draws up to n distinct configurations from the search space."""
+        space = SEARCH_SPACES[self.model_name]
+        configs, seen = [], set()
+        for _ in range(n * 10):
+            config = {name: values[self.rng.integers(len(values))] for name, values in space.items()}
+            key = _params_key(config)
+            if key not in seen:
+                seen.add(key)
+                configs.append(config)
+            if len(configs) == n:
+                break
+        return configs
+
+    def _fit(self, config, n_estimators):
+        """Fits one trial and returns (validation RMSE, trees actually used)."""
+        params = {**DEFAULT_PARAMS[self.model_name], **config, 'n_estimators': n_estimators}
+        if self.model_name == 'RandomForest':
+            from sklearn.ensemble import RandomForestRegressor
+            model = RandomForestRegressor(**params, n_jobs=self.n_threads)
+            model.fit(self.X_fit, self.y_fit)
+            preds = model.predict(self.X_val)
+            return float(np.sqrt(np.mean((preds - self.y_val) ** 2))), n_estimators
+
+        from xgboost import XGBRegressor
+        model = XGBRegressor(**params, n_jobs=self.n_threads, eval_metric='rmse',
+                             early_stopping_rounds=max(5, n_estimators // 10))
+        model.fit(self.X_fit, self.y_fit, eval_set=[(self.X_val, self.y_val)], verbose=False)
+        return float(model.best_score), int(model.best_iteration) + 1
+
+    def evaluate(self, configs, n_estimators):
+        """Scores configs with the given number of trees; returns one trial record per config."""
+        keys = [_params_key({**config, 'n_estimators': n_estimators}) for config in configs]
+        with self._lock:
+            todo = [(config, key) for config, key in zip(configs, keys) if key not in self._trials]
+        instrumentation.increment('stock_cache_requests_total', len(configs) - len(todo), cache='tuning_trials', result='hit')
+        instrumentation.increment('stock_cache_requests_total', len(todo), cache='tuning_trials', result='miss')
+        if todo:
+            with ThreadPoolExecutor(max_workers=min(self.n_jobs, len(todo))) as pool:
+                results = list(pool.map(lambda item: self._fit(item[0], n_estimators), todo))
+            with self._lock:
+                for (_, key), (score, used) in zip(todo, results):
+                    self._trials[key] = {'rmse': score, 'n_estimators': used}
+                self.n_fitted += len(todo)
+                self._write_trials()
+        return [{'params': config, **self._trials[key]} for config, key in zip(configs, keys)]
+
+    def successive_halving(self, configs, min_resource=None):
+        """Runs one successive halving bracket and returns the best trial record."""
+        budget = min_resource or self.min_resource
+        while True:
+            trials = self.evaluate(configs, budget)
+            order = sorted(range(len(trials)), key=lambda i: trials[i]['rmse'])
+            next_budget = budget * self.eta
+            if len(configs) == 1 or next_budget > self.max_resource:
+                return trials[order[0]]
+            keep = max(1, len(configs) // self.eta)
+            configs = [configs[i] for i in order[:keep]]
+            budget = next_budget
+
+    def hyperband(self):
+        """Runs all Hyperband brackets and returns the best trial record."""
+        s_max = int(math.floor(math.log(self.max_resource / self.min_resource, self.eta) + 1e-9))
+        best = None
+        for s in range(s_max, -1, -1):
+            n = int(math.ceil((s_max + 1) / (s + 1) * self.eta ** s))
+            budget = max(self.min_resource, int(round(self.max_resource / self.eta ** s)))
+            trial = self.successive_halving(self.sample_configs(n), budget)
+            print(f"  bracket s={s}: {n} configs from {budget} trees, best validation RMSE {trial['rmse']:.5f}")
+            if best is None or trial['rmse'] < best['rmse']:
+                best = trial
+        return best
+
+    def run(self, method='hyperband', n_configs=27):
+        """
+        Searches and returns the best full parameter set (defaults merged in,
+        n_estimators set to the trees actually used) and its validation RMSE.
+        """
+        print(f"Tuning {self.model_name} ({method}, data {self.data_hash[:10]})...")
+        if method == 'hyperband':
+            best = self.hyperband()
+        elif method == 'successive_halving':
+            best = self.successive_halving(self.sample_configs(n_configs))
+        else:
+            raise ValueError(f"Unknown tuning method '{method}'")
+        params = {**DEFAULT_PARAMS[self.model_name], **best['params'], 'n_estimators': best['n_estimators']}
+        print(f"Best {self.model_name} params: {params} (validation RMSE {best['rmse']:.5f}, "
+              f"{self.n_fitted} trials fitted, rest from cache)")
+        return params, best['rmse']
@@ -1,24 +1,162 @@
-import matplotlib.pyplot as plt
-import seaborn as sns
+import hashlib
+import json
 import os
+import threading
+import numpy as np
 import pandas as pd
+from src import instrumentation
+
+# Bump when the look of the charts changes so cached PNGs are redrawn
+RENDER_VERSION = 1
+HASHES_FILE = '.render_hashes.json'
+
+def _new_axes(figsize):
+    """
+    A figure drawn by the object-oriented Agg API: no pyplot, so nothing is
+    registered globally and figures can be rendered from any thread or process.
+    Styled like seaborn's darkgrid.
+    """
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+    fig = Figure(figsize=figsize)
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
+    ax.set_facecolor('#EAEAF2')
+    ax.grid(True, color='white', linewidth=1)
+    ax.set_axisbelow(True)
+    for spine in ax.spines.values():
+        spine.set_visible(False)
+    return fig, ax
+
+def render_lines(path, series, title, xlabel, ylabel, max_points=None, figsize=(12, 6)):
+    """
+    Line chart of series sharing one x axis (row index).
+    series: list of (values, label, color, alpha). Longer than max_points,
+    all lines are decimated with LTTB on one shared set of rows.
+    """
+    x = np.arange(len(series[0][0]))
+    ys = [np.asarray(values) for values, *_ in series]
+    if max_points and len(x) > max_points:
+        from src.downsample import lttb_indices
+        keep = lttb_indices(np.column_stack(ys), max_points)
+        x, ys = x[keep], [y[keep] for y in ys]
+    fig, ax = _new_axes(figsize)
+    for y, (_, label, color, alpha) in zip(ys, series):
+        ax.plot(x, y, label=label, color=color, alpha=alpha)
+    ax.set_title(title)
+    ax.set_xlabel(xlabel)
+    ax.set_ylabel(ylabel)
+    ax.legend()
+    fig.savefig(path)
+
+def render_bars(path, labels, values, title, ylabel, palette='viridis', figsize=(10, 5)):
+    """Bar chart with one bar per label, colored along a matplotlib colormap."""
+    from matplotlib import colormaps
+    colors = colormaps[palette](np.linspace(0.15, 0.85, len(labels)))
+    fig, ax = _new_axes(figsize)
+    ax.bar(labels, values, color=colors)
+    ax.set_title(title)
+    ax.set_ylabel(ylabel)
+    fig.savefig(path)
+
+def _content_hash(render, kwargs):
+    """Digest of a render call: function, arguments and the bytes of every array."""
+    digest = hashlib.sha1(f"{render.__name__}:{RENDER_VERSION}".encode('utf-8'))
+
+    def encode(value):
+        if isinstance(value, (np.ndarray, pd.Series)):
+            arr = np.ascontiguousarray(value)
+            digest.update(str((arr.shape, arr.dtype.str)).encode('utf-8'))
+            digest.update(arr.tobytes())
+            return '<array>'
+        if isinstance(value, (list, tuple)):
+            return [encode(v) for v in value]
+        return value
+
+    digest.update(json.dumps({k: encode(v) for k, v in sorted(kwargs.items())}, default=str).encode('utf-8'))
+    return digest.hexdigest()
 
 class Visualizer:
-    def __init__(self, output_dir='outputs'):
+    """
+    Writes the report charts to output_dir.
+
+    With workers > 0 charts are rendered in a pool of processes and the
+    plot_* calls return at once, so the caller can keep training; call
+    wait() (or close()) before relying on the files. A chart is skipped when
+    its PNG exists and was rendered from identical inputs (content hashes are
+    kept in output_dir/.render_hashes.json). Line charts longer than
+    max_points are decimated.
+    """
+
+    def __init__(self, output_dir='outputs', workers=0, max_points=2000):
         self.output_dir = output_dir
+        self.workers = workers
+        self.max_points = max_points
         os.makedirs(self.output_dir, exist_ok=True)
-        sns.set(style='darkgrid')
+        self._hashes_path = os.path.join(output_dir, HASHES_FILE)
+        self._hashes = self._read_hashes()
+        self._lock = threading.Lock()
+        self._pool = None
+        self._pending = []
+
+    def _read_hashes(self):
+        try:
+            with open(self._hashes_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _rendered(self, filename, digest):
+        with self._lock:
+            self._hashes[filename] = digest
+            with open(self._hashes_path + '.tmp', 'w') as f:
+                json.dump(self._hashes, f, indent=2)
+            os.replace(self._hashes_path + '.tmp', self._hashes_path)
+
+    def _submit(self, filename, render, **kwargs):
+        path = os.path.join(self.output_dir, filename)
+        digest = _content_hash(render, kwargs)
+        up_to_date = os.path.exists(path) and self._hashes.get(filename) == digest
+        instrumentation.cache_lookup('charts', hit=up_to_date)
+        if up_to_date:
+            print(f"{filename} is up to date, not redrawn.")
+            return
+        if not self.workers:
+            render(path, **kwargs)
+            self._rendered(filename, digest)
+            return
+        if self._pool is None:
+            from concurrent.futures import ProcessPoolExecutor
+            from multiprocessing import get_context
+            # spawn: the parent may already run TensorFlow / thread pools
+            self._pool = ProcessPoolExecutor(self.workers, mp_context=get_context('spawn'))
+        self._pending.append((filename, digest, self._pool.submit(render, path, **kwargs)))
+
+    def wait(self):
+        """Blocks until every submitted chart is written; failures are reported, not raised."""
+        pending, self._pending = self._pending, []
+        for filename, digest, future in pending:
+            try:
+                future.result()
+            except Exception as e:
+                print(f"Error rendering {filename}: {e}")
+                continue
+            self._rendered(filename, digest)
+
+    def close(self):
+        self.wait()
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
 
     def plot_actual_vs_predicted(self, actual, predicted, model_name, title="Actual vs Predicted Prices"):
-        plt.figure(figsize=(12, 6))
-        plt.plot(actual, label='Actual Price', color='blue', alpha=0.6)
-        plt.plot(predicted, label=f'Predicted Price ({model_name})', color='orange', alpha=0.8)
-        plt.title(f"{title} - {model_name}")
-        plt.xlabel("Time (Test Set Index)")
-        plt.ylabel("Price")
-        plt.legend()
-        plt.savefig(f"{self.output_dir}/{model_name}_prediction.png")
-        plt.close()
+        self._submit(
+            f"{model_name}_prediction.png", render_lines,
+            series=[(np.asarray(actual), 'Actual Price', 'blue', 0.6),
+                    (np.asarray(predicted), f'Predicted Price ({model_name})', 'orange', 0.8)],
+            title=f"{title} - {model_name}", xlabel="Time (Test Set Index)", ylabel="Price",
+            max_points=self.max_points,
+        )
 
     def plot_risk_comparison(self, risk_metrics_dict):
         """
@@ -26,22 +164,17 @@ class Visualizer:
         risk_metrics_dict: { 'ModelName': {'Sharpe': x, 'Var': y ...} }
         """
         df = pd.DataFrame(risk_metrics_dict).T
-        
+        labels = list(df.index)
+
         # Plot Sharpe Ratio
-        plt.figure(figsize=(10, 5))
-        sns.barplot(x=df.index, y=df['Sharpe Ratio'], hue=df.index, legend=False, palette='viridis')
-        plt.title("Sharpe Ratio Comparison")
-        plt.ylabel("Sharpe Ratio")
-        plt.savefig(f"{self.output_dir}/sharpe_comparison.png")
-        plt.close()
-        
+        self._submit("sharpe_comparison.png", render_bars, labels=labels,
+                     values=df['Sharpe Ratio'].to_numpy(dtype=float),
+                     title="Sharpe Ratio Comparison", ylabel="Sharpe Ratio", palette='viridis')
+
         # Plot VaR
-        plt.figure(figsize=(10, 5))
-        sns.barplot(x=df.index, y=df['VaR (95%)'], hue=df.index, legend=False, palette='magma')
-        plt.title("Value at Risk (95%) Comparison")
-        plt.ylabel("VaR")
-        plt.savefig(f"{self.output_dir}/var_comparison.png")
-        plt.close()
+        self._submit("var_comparison.png", render_bars, labels=labels,
+                     values=df['VaR (95%)'].to_numpy(dtype=float),
+                     title="Value at Risk (95%) Comparison", ylabel="VaR", palette='magma')
 
     def plot_model_performance(self, perf_metrics_dict):
         """
@@ -49,11 +182,8 @@ class Visualizer:
         perf_metrics_dict: { 'ModelName': {'RMSE': x, 'MAPE': y ...} }
         """
         df = pd.DataFrame(perf_metrics_dict).T
-        
+
         # Plot RMSE
-        plt.figure(figsize=(10, 5))
-        sns.barplot(x=df.index, y=df['RMSE'], hue=df.index, legend=False, palette='Blues_d')
-        plt.title("RMSE Comparison (Lower is Better)")
-        plt.ylabel("RMSE")
-        plt.savefig(f"{self.output_dir}/rmse_comparison.png")
-        plt.close()
+        self._submit("rmse_comparison.png", render_bars, labels=list(df.index),
+                     values=df['RMSE'].to_numpy(dtype=float),
+                     title="RMSE Comparison (Lower is Better)", ylabel="RMSE", palette='Blues_r')
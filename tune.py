@@ -0,0 +1,49 @@
+import argparse
+from src.data_loader import DataLoader
+from src.data_sources import SOURCES, get_source
+from src.dataset import SupervisedDatasetBuilder, horizon_arg
+from src.feature_engineering import FeatureEngineer
+from src.models import ModelTrainer
+from src.tuning import SEARCH_SPACES, HyperbandTuner, save_best_params
+
+def tune(tickers, start_date, end_date, model_name='XGBoost', method='hyperband', jobs=None,
+         tuning_dir='tuning', source=None, horizon=1):
+    """
+    Tunes one model per ticker and persists the best parameters for the API to reuse.
+    The target is Close `horizon` days ahead, as in main.py (0: same-day Close).
+    """
+    results = {}
+    for ticker in tickers:
+        print(f"\n=== {ticker} ===")
+        df = DataLoader(ticker, start_date, end_date, source=get_source(source)).load_data()
+        if df is None:
+            continue
+        features = FeatureEngineer(df).prepare_matrix()
+        trainer = ModelTrainer(features, target_col='Close')
+        if horizon:
+            trainer.load_dataset(SupervisedDatasetBuilder(features, 'Close', horizons=(horizon,)).build())
+        else:
+            trainer.split_data()
+        tuner = HyperbandTuner(trainer, model_name, n_jobs=jobs, tuning_dir=tuning_dir)
+        params, score = tuner.run(method)
+        save_best_params(ticker, model_name, params, score, tuning_dir, horizon=horizon)
+        results[ticker] = params
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Hyperparameter search for RandomForest / XGBoost")
+    parser.add_argument('--tickers', nargs='+', default=['AAPL'], help='Stock Ticker Symbols')
+    parser.add_argument('--start', type=str, default='2020-01-01', help='Start Date (YYYY-MM-DD)')
+    parser.add_argument('--end', type=str, default='2023-01-01', help='End Date (YYYY-MM-DD)')
+    parser.add_argument('--model', choices=list(SEARCH_SPACES), default='XGBoost')
+    parser.add_argument('--method', choices=['hyperband', 'successive_halving'], default='hyperband')
+    parser.add_argument('--horizon', type=horizon_arg, default=1,
+                        help='Tune for the close this many days ahead (0: same-day close)')
+    parser.add_argument('--jobs', type=int, default=None, help='Trials fitted in parallel (default: all cores)')
+    parser.add_argument('--tuning-dir', default='tuning', help='Where trial results and best params are kept')
+    parser.add_argument('--source', choices=list(SOURCES), default=None,
+                        help='Price data source (defaults to $STOCK_DATA_SOURCE, then yfinance)')
+    args = parser.parse_args()
+
+    tune(args.tickers, args.start, args.end, args.model, args.method, args.jobs, args.tuning_dir, args.source,
+         args.horizon)